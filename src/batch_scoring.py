@@ -0,0 +1,113 @@
+import heapq
+import numpy as np
+from optimal_schedule import (DAY_PENALTY, EARLY_CUTOFF, EARLY_PENALTY, ScheduleSpace,
+                              build_course_options, combo_to_schedule,
+                              iter_valid_combos)
+from sections import WEEK_DAYS, SectionTable
+
+# ────────────────────────────────────────────────────────────────
+# Vectorised score_schedule
+#
+# A slot table holds one row per slot (start/end minutes, day bitmask,
+# flags; see sections.SectionTable); a candidate schedule is a row of slot
+# indices into it, padded with -1.  score_batch scores a whole
+# (n_candidates, width) block at once and gives exactly the numbers
+# score_schedule would.
+# ────────────────────────────────────────────────────────────────
+
+def build_slot_table(slots):
+    """Slot table for score_batch: a SectionTable as NumPy arrays."""
+    table = SectionTable(slots)
+    return {'start':  np.asarray(table.start),
+            'end':    np.asarray(table.end),
+            'days':   np.asarray(table.days),
+            'timed':  np.asarray(table.timed).astype(bool),
+            'campus': np.asarray(table.campus).astype(bool)}
+
+
+def score_batch(table, candidates):
+    """
+    Score many schedules at once.
+
+    candidates – int array (n_candidates, width) of slot-table indices, -1 = none
+    Returns an int64 array of scores, one per candidate.
+    """
+    candidates = np.asarray(candidates)
+    present = candidates >= 0
+    idx     = np.where(present, candidates, 0)
+
+    start  = table['start'][idx]
+    end    = table['end'][idx]
+    days   = table['days'][idx]
+    timed  = table['timed'][idx] & present
+    campus = table['campus'][idx] & timed
+
+    early = (timed & (start < EARLY_CUTOFF)).sum(axis=1) * EARLY_PENALTY
+
+    active_days = np.zeros(len(candidates), dtype=np.int64)
+    gaps        = np.zeros(len(candidates), dtype=np.int64)
+    big         = np.iinfo(np.int32).max
+
+    for d in range(len(WEEK_DAYS)):
+        on = timed & ((days >> d) & 1).astype(bool)
+        active_days += (on & campus).any(axis=1)
+
+        # score_schedule sorts a day's slots by start with a stable sort, then
+        # sums max(0, next start - previous end) over neighbours
+        order    = np.argsort(np.where(on, start, big), axis=1, kind='stable')
+        on_s     = np.take_along_axis(on, order, axis=1)
+        start_s  = np.take_along_axis(start, order, axis=1)
+        end_s    = np.take_along_axis(end, order, axis=1)
+        pair     = on_s[:, 1:] & on_s[:, :-1]
+        gaps    += np.where(pair, np.maximum(0, start_s[:, 1:] - end_s[:, :-1]), 0).sum(axis=1)
+
+    return active_days * DAY_PENALTY + gaps + early
+
+
+# Enumerate every valid schedule, score them block_size at a time with
+# score_batch and keep the best top_n as (score, schedule) pairs.  Same result
+# as best_schedules, but cost grows with the number of valid schedules rather
+# than the nodes branch-and-bound visits.
+def best_schedules_batched(course_groups, top_n=3, block_size=4096):
+    all_course_options = build_course_options(course_groups)
+    space = ScheduleSpace(all_course_options)
+    if top_n <= 0:
+        return []
+
+    # every slot once, and per course an (options, 2) array of slot indices
+    slots, slot_index = [], {}
+    option_slots = []
+    for options in all_course_options:
+        table = np.full((len(options), 2), -1, dtype=np.int64)
+        for k, option in enumerate(options):
+            for j, slot in enumerate(option):
+                if id(slot) not in slot_index:
+                    slot_index[id(slot)] = len(slots)
+                    slots.append(slot)
+                table[k, j] = slot_index[id(slot)]
+        option_slots.append(table)
+    table = build_slot_table(slots)
+
+    best = []
+    def score_block(block):
+        nonlocal best
+        combos = np.array(block, dtype=np.int64)
+        candidates = np.concatenate(
+            [option_slots[c][combos[:, c]] for c in range(len(option_slots))], axis=1)
+        scores = score_batch(table, candidates)
+        if len(best) == top_n:
+            keep = np.nonzero(scores <= best[-1][0])[0]
+        else:
+            keep = range(len(block))
+        best = heapq.nsmallest(top_n, best + [(int(scores[i]), block[i]) for i in keep])
+
+    block = []
+    for combo in iter_valid_combos(space):
+        block.append(combo)
+        if len(block) == block_size:
+            score_block(block)
+            block = []
+    if block:
+        score_block(block)
+
+    return [(score, combo_to_schedule(all_course_options, combo)) for score, combo in best]
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# ─────────────────────────────────────────────────────────────────────────────
+# bench.py  –  throughput benchmarks on a synthetic term dump or saved pages
+# ─────────────────────────────────────────────────────────────────────────────
+
+import argparse
+import html as html_lib
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from html_extract import BACKENDS, etree
+from parsing import iter_records
+from search_by_number import course_data_lines
+
+SUBJECTS   = ["COMP", "MATH", "STAT", "PHYS", "CHEM", "BIOL", "ECON", "PSYC", "HIST", "ENGL"]
+PROFS      = ["Ada Lovelace", "Alan Turing", "Grace Hopper", "Edsger Dijkstra",
+              "Barbara Liskov", "Donald Knuth", "Frances Allen", "John Backus"]
+BUILDINGS  = ["HP", "SC", "ME", "TB", "AA", "MC", "ON"]
+DAY_SETS   = ["Mon Wed", "Tue Thu", "Wed Fri", "Mon", "Tue", "Wed", "Thu", "Fri"]
+START_TIMES = [(8, 35), (10, 5), (11, 35), (13, 5), (14, 35), (16, 5), (18, 5)]
+# What a fresh interpreter has to import before it can do each kind of run
+STARTUP = {
+    "python":  "pass",                      # bare interpreter, the baseline
+    "cli":     "import main",               # --format text/json
+    "cli+png": "import main, plotting",     # --format png
+}
+MEETING = ("Meeting Date: Jan 07, 2026 to Apr 08, 2026\tDays: {days}\t"
+           "Time: {time}\tBuilding: {building}\tRoom: {room}")
+
+
+def synthetic_dump(n_courses=1500, lectures=2, tutorials=3, seed=0, conflict_density=0.0):
+    """
+    Lines in the format parse_course_data produces, for n_courses courses of
+    `lectures` lectures with `tutorials` tutorials each.  conflict_density
+    (0 to 1) is the share of meetings crowded into the same few days and
+    times, so higher values give more clashes.
+    Returns (course codes, lines).
+    """
+    rng = random.Random(seed)
+    lines = []
+    codes = []
+    crn = 10000
+
+    def meeting(day_sets, length):
+        starts = START_TIMES
+        if conflict_density and rng.random() < conflict_density:
+            day_sets, starts = day_sets[:1], START_TIMES[:2]
+        h, m = rng.choice(starts)
+        end = h * 60 + m + length
+        return MEETING.format(days=rng.choice(day_sets),
+                              time=f"{h:02d}:{m:02d} - {end // 60:02d}:{end % 60:02d}",
+                              building=rng.choice(BUILDINGS), room=rng.randint(100, 599))
+
+    for i in range(n_courses):
+        code = f"{SUBJECTS[i % len(SUBJECTS)]} {1000 + i // len(SUBJECTS):04d}"
+        codes.append(code)
+        for lec in range(lectures):
+            crn += 1
+            section = chr(ord("A") + lec)
+            lines.append(f"\tOpen\t{crn}\t{code} {section}\t0.5\tCourse Title\tLecture\t"
+                         f"No\tNo\t{rng.choice(PROFS)}")
+            lines.append(meeting(DAY_SETS[:3], 80))
+            lines.append("Section Information:\tLecture notes online")
+            for tut in range(tutorials):
+                crn += 1
+                lines.append(f"\tOpen\t{crn}\t{code} {section}{tut + 1}\t0\tCourse Title\t"
+                             f"Tutorial\tNo\tNo\tTeaching Assistant")
+                lines.append(meeting(DAY_SETS[3:], 80))
+            lines.append(f"Also Register in:\t{code} {section}1")
+    return codes, lines
+
+
+def synthetic_html(lines):
+    """
+    A search results page in the shape of Carleton Central's: one table row
+    per line, cells escaped, meeting rows in a table nested inside the row
+    of the section they belong to.
+    """
+    def row(line):
+        cells = "".join(f"<td>{html_lib.escape(cell) or '&nbsp;'}</td>"
+                        for cell in line.split("\t"))
+        return f"<tr>{cells}</tr>\n"
+
+    out = ['<html><head><script>var x = "<td>not a cell</td>";</script></head><body>\n',
+           '<table class="datadisplaytable">\n<tr><th>Status</th><th>CRN</th><th>Course</th></tr>\n']
+    for line in lines:
+        if line.startswith("Meeting Date:"):
+            out.append(f'<tr><td colspan="10"><table>{row(line)}</table></td></tr>\n')
+        else:
+            out.append(row(line))
+        out.append("<!-- row end -->\n")
+    out.append("</table>\n</body></html>\n")
+    return "".join(out)
+
+
+def bench_extract(pages, reps, chunk_size=65536):
+    """
+    Best-of-reps extraction time and peak traced memory per backend over
+    the HTML pages, fed in chunk_size pieces.  Every backend must return
+    the same lines.
+    """
+    results = {}
+    expected = None
+    for backend in BACKENDS:
+        if backend == "lxml" and etree is None:
+            continue
+        best = float("inf")
+        for _ in range(reps):
+            t0 = time.perf_counter()
+            lines = [list(course_data_lines(_split(page, chunk_size), backend)) for page in pages]
+            best = min(best, time.perf_counter() - t0)
+
+        tracemalloc.start()
+        for page in pages:
+            for _ in course_data_lines(_split(page, chunk_size), backend):
+                pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        if expected is None:
+            expected = lines
+        elif lines != expected:
+            raise AssertionError(f"{backend} output differs from {BACKENDS[0]}")
+        results[backend] = (best, peak)
+    return results
+
+
+# Helper: a page as an iterator of chunks, like a streamed response
+def _split(page, size):
+    return (page[i:i + size] for i in range(0, len(page), size))
+
+
+def bench_startup(reps):
+    """Best-of-reps seconds for a fresh interpreter to run each STARTUP snippet."""
+    src = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for label, code in STARTUP.items():
+        best = float("inf")
+        for _ in range(reps):
+            t0 = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], cwd=src, check=True)
+            best = min(best, time.perf_counter() - t0)
+        results[label] = best
+    return results
+
+
+def bench_parse(codes, lines, reps):
+    """Best-of-reps parse throughput in lines/sec."""
+    wanted = set(codes)
+    best = float("inf")
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        for _ in iter_records(wanted, lines):
+            pass
+        best = min(best, time.perf_counter() - t0)
+    return len(lines) / best
+
+
+def main():
+    parser = argparse.ArgumentParser("Scheduler benchmarks")
+    parser.add_argument("--courses", type=int, default=1500)
+    parser.add_argument("--reps", type=int, default=5)
+    parser.add_argument("--html", nargs="*", metavar="FILE",
+                        help="saved search result pages to benchmark HTML extraction on "
+                             "(default: a synthetic page)")
+    parser.add_argument("--save-html", metavar="FILE",
+                        help="write the synthetic page here, to keep as a fixture")
+    args = parser.parse_args()
+
+    codes, lines = synthetic_dump(args.courses)
+    rate = bench_parse(codes, lines, args.reps)
+    print(f"parse_lines  {len(lines)} lines  {rate:,.0f} lines/sec")
+
+    if args.html:
+        pages = []
+        for path in args.html:
+            with open(path, encoding="utf-8") as f:
+                pages.append(f.read())
+    else:
+        pages = [synthetic_html(lines)]
+        if args.save_html:
+            with open(args.save_html, "w", encoding="utf-8") as f:
+                f.write(pages[0])
+    size = sum(len(page) for page in pages) / 1e6
+    for backend, (seconds, peak) in bench_extract(pages, args.reps).items():
+        print(f"extract/{backend:<6} {size:.1f} MB  {size / seconds:6.1f} MB/sec  "
+              f"peak {peak / 1e6:.1f} MB")
+
+    for label, seconds in bench_startup(args.reps).items():
+        print(f"startup/{label:<7} {seconds * 1000:6.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,206 @@
+import hashlib
+import json
 import sqlite3
 import os
+import threading
+import time
+from datetime import date, datetime
+
+import profiling
+from sections import make_section, section_from_record
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
 DB_PATH = os.path.join(PROJECT_ROOT, "courses.db")
 
+# Applied once to every new connection.  WAL lets readers run while a writer
+# commits; under WAL, synchronous=NORMAL still keeps the file consistent after a crash.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",       # KiB
+    "PRAGMA mmap_size = 134217728",
+)
+
+# How long fetched course data stays fresh, in seconds, by term code
+# (e.g. {"202610": 6 * 3600} during add/drop).  Terms not listed use
+# DEFAULT_TTL until they are over, then never go stale; see term_ttl.
+TERM_TTLS = {}
+DEFAULT_TTL = 24 * 3600
+
+# Last month of each term season: 10 = winter, 20 = summer, 30 = fall
+TERM_LAST_MONTH = {"10": 4, "20": 8, "30": 12}
+
+# sqlite3 connections may not be shared between threads, so each thread
+# keeps its own, opened on first use and reused until close_connection()
+_local = threading.local()
+
 
 def get_connection():
-    return sqlite3.connect(DB_PATH)
+    """This thread's connection to DB_PATH, opened on first use."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.path != DB_PATH:
+        if conn is not None:
+            conn.close()
+        conn = sqlite3.connect(DB_PATH)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        _local.conn, _local.path = conn, DB_PATH
+    return conn
+
+
+def close_connection():
+    """Close this thread's connection, if it has one."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+# Helper: split a list of query parameters into pieces small enough for one
+# statement (SQLite caps the number of ? placeholders)
+MAX_PARAMS = 500
+
+def _chunks(values):
+    values = list(values)
+    for i in range(0, len(values), MAX_PARAMS):
+        yield values[i:i + MAX_PARAMS]
 
 
 def init_db():
     """Create tables if they don't exist."""
     conn = get_connection()
-    cursor = conn.cursor()
+    with conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS courses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                term TEXT NOT NULL,
+                course_number TEXT NOT NULL,
+                raw_data TEXT NOT NULL,
+                fetched_at REAL,
+                content_hash TEXT,
+                UNIQUE(term, course_number)
+            )
+        ''')
+        # databases from before fetched_at/content_hash: add them; rows without
+        # fetched_at count as stale
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(courses)')}
+        if 'fetched_at' not in columns:
+            cursor.execute('ALTER TABLE courses ADD COLUMN fetched_at REAL')
+        if 'content_hash' not in columns:
+            cursor.execute('ALTER TABLE courses ADD COLUMN content_hash TEXT')
+            rows = cursor.execute('SELECT id, raw_data FROM courses').fetchall()
+            cursor.executemany('UPDATE courses SET content_hash = ? WHERE id = ?',
+                               [(content_hash(raw_data), row_id) for row_id, raw_data in rows])
+        # Parsed form of raw_data, filled by save_course; the blob stays as an audit copy
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sections (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                term TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                number TEXT NOT NULL,
+                section TEXT NOT NULL,
+                crn TEXT NOT NULL,
+                prof TEXT NOT NULL,
+                has_number INTEGER NOT NULL,
+                UNIQUE(term, subject, number, section)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS meetings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                section_id INTEGER NOT NULL REFERENCES sections(id),
+                days INTEGER NOT NULL,
+                start_min INTEGER,
+                end_min INTEGER,
+                building TEXT NOT NULL,
+                first_day TEXT,
+                last_day TEXT
+            )
+        ''')
+        # databases from before meeting dates were kept: add the columns and
+        # index the stored blobs again to fill them
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(meetings)')}
+        if 'first_day' not in columns:
+            cursor.execute('ALTER TABLE meetings ADD COLUMN first_day TEXT')
+            cursor.execute('ALTER TABLE meetings ADD COLUMN last_day TEXT')
+            cursor.execute('SELECT term, course_number, raw_data FROM courses')
+            for term, course_number, raw_data in cursor.fetchall():
+                _index_sections(cursor, term, course_number, course_sections(raw_data))
+        # Carleton Central session per term and server, reused across runs
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                term TEXT NOT NULL,
+                base_url TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                cookies TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (term, base_url)
+            )
+        ''')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_sections_course ON sections (term, subject, number)')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_meetings_section ON meetings (section_id)')
+
+        # databases from before the sections table: index the blobs already stored
+        cursor.execute('''
+            SELECT term, course_number, raw_data FROM courses c
+            WHERE NOT EXISTS (SELECT 1 FROM sections s
+                              WHERE s.term = c.term AND s.number = c.course_number)
+        ''')
+        for term, course_number, raw_data in cursor.fetchall():
+            _index_sections(cursor, term, course_number, course_sections(raw_data))
+
+
+def course_sections(raw_data):
+    """
+    The sections of a course blob as (crn, sections.Section) pairs, the
+    first row of each (course, section) only, as _index_sections stores them.
+    """
+    from parsing import iter_rows   # parsing imports this module
+
+    seen = set()
+    result = []
+    with profiling.stage("parse"):
+        for crn, record in iter_rows(None, raw_data.split('\n')):
+            slot = section_from_record(record, warn=False)
+            if slot is None or (slot.course, slot.section) in seen:
+                continue
+            seen.add((slot.course, slot.section))
+            result.append((crn, slot))
+    profiling.count("records_parsed", len(result))
+    return result
+
+
+# Helper: replace the sections/meetings rows of one raw_data blob with
+# course_sections(raw_data).  Every course in the blob is stored, not only
+# the ones asked for.
+def _index_sections(cursor, term, course_number, sections):
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS courses (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            term TEXT NOT NULL,
-            course_number TEXT NOT NULL,
-            raw_data TEXT NOT NULL,
-            UNIQUE(term, course_number)
-        )
-    ''')
-    conn.commit()
-    conn.close()
+        DELETE FROM meetings WHERE section_id IN
+            (SELECT id FROM sections WHERE term = ? AND number = ?)
+    ''', (term, course_number))
+    cursor.execute('DELETE FROM sections WHERE term = ? AND number = ?',
+                   (term, course_number))
+
+    for crn, slot in sections:
+        subject, number = slot.course.split()
+        cursor.execute('''
+            INSERT OR IGNORE INTO sections
+                (term, subject, number, section, crn, prof, has_number)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (term, subject, number, slot.section, crn, slot.prof, int(slot.has_number)))
+        if cursor.rowcount:
+            first_day, last_day = slot.dates or (None, None)
+            cursor.execute('''
+                INSERT INTO meetings
+                    (section_id, days, start_min, end_min, building, first_day, last_day)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (cursor.lastrowid, slot.days, slot.start, slot.end, slot.building,
+                  first_day and first_day.isoformat(), last_day and last_day.isoformat()))
 
 
 def course_exists(term, course_number):
@@ -36,20 +212,116 @@ def course_exists(term, course_number):
         (term, course_number)
     )
     result = cursor.fetchone()
-    conn.close()
     return result is not None
 
 
-def save_course(term, course_number, raw_data):
-    """Save course data to database."""
+def save_course(term, course_number, raw_data, sections=None):
+    """
+    Save course data to database, along with its parsed sections.
+    sections may pass in course_sections(raw_data) if the caller already has it.
+    Returns True if the content was new or changed.
+    """
+    parsed = None if sections is None else {course_number: sections}
+    return bool(save_courses_bulk(term, [(course_number, raw_data)], parsed))
+
+
+def save_courses_bulk(term, courses, parsed=None):
+    """
+    Save many (course_number, raw_data) pairs, with their parsed sections,
+    in a single transaction: either all of them are stored or none.
+
+    Every course is marked as fetched now, but its sections are only
+    re-parsed if the content changed.  parsed may map course numbers to
+    course_sections() results already at hand.  Returns the course numbers
+    whose content is new or changed.
+    """
     conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT OR REPLACE INTO courses (term, course_number, raw_data)
-        VALUES (?, ?, ?)
-    ''', (term, course_number, raw_data))
-    conn.commit()
-    conn.close()
+    now = time.time()
+    changed = []
+    with conn:
+        cursor = conn.cursor()
+        for course_number, raw_data in courses:
+            digest = content_hash(raw_data)
+            cursor.execute(
+                'SELECT content_hash FROM courses WHERE term = ? AND course_number = ?',
+                (term, course_number)
+            )
+            stored = cursor.fetchone()
+            if stored is not None and stored[0] == digest:
+                cursor.execute(
+                    'UPDATE courses SET fetched_at = ? WHERE term = ? AND course_number = ?',
+                    (now, term, course_number)
+                )
+                continue
+
+            cursor.execute('''
+                INSERT OR REPLACE INTO courses
+                    (term, course_number, raw_data, fetched_at, content_hash)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (term, course_number, raw_data, now, digest))
+            sections = (parsed or {}).get(course_number)
+            if sections is None:
+                sections = course_sections(raw_data)
+            _index_sections(cursor, term, course_number, sections)
+            changed.append(course_number)
+    return changed
+
+
+def content_hash(raw_data):
+    return hashlib.sha256(raw_data.encode('utf-8')).hexdigest()
+
+
+def term_ttl(term, now=None):
+    """
+    Seconds course data for a term stays fresh: TERM_TTLS[term] if set,
+    otherwise DEFAULT_TTL, or None (never stale) once the term is over.
+    """
+    if term in TERM_TTLS:
+        return TERM_TTLS[term]
+    now = datetime.fromtimestamp(now if now is not None else time.time())
+    year, season = term[:4], term[4:]
+    if year.isdigit() and season in TERM_LAST_MONTH:
+        if (now.year, now.month) > (int(year), TERM_LAST_MONTH[season]):
+            return None
+    return DEFAULT_TTL
+
+
+def stale_courses(term, course_numbers, ttl=None):
+    """
+    The subset of course_numbers whose stored data for a term is older than
+    ttl seconds (default: term_ttl(term)), or has no fetch time.  Numbers
+    with no data at all are not included; see courses_exist_many.
+    """
+    ttl = term_ttl(term) if ttl is None else ttl
+    if ttl is None:
+        return set()
+
+    conn = get_connection()
+    cutoff = time.time() - ttl
+    stale = set()
+    for chunk in _chunks(course_numbers):
+        placeholders = ','.join('?' * len(chunk))
+        cursor = conn.execute(
+            f'SELECT course_number FROM courses WHERE term = ? AND course_number IN ({placeholders}) '
+            f'AND (fetched_at IS NULL OR fetched_at < ?)',
+            (term, *chunk, cutoff)
+        )
+        stale.update(row[0] for row in cursor)
+    return stale
+
+
+def courses_exist_many(term, course_numbers):
+    """The subset of course_numbers that already have data for a term."""
+    conn = get_connection()
+    found = set()
+    for chunk in _chunks(course_numbers):
+        placeholders = ','.join('?' * len(chunk))
+        cursor = conn.execute(
+            f'SELECT course_number FROM courses WHERE term = ? AND course_number IN ({placeholders})',
+            (term, *chunk)
+        )
+        found.update(row[0] for row in cursor)
+    return found
 
 
 def get_course(term, course_number):
@@ -61,19 +333,106 @@ def get_course(term, course_number):
         (term, course_number)
     )
     result = cursor.fetchone()
-    conn.close()
     return result[0] if result else None
 
 
+def iter_courses(term, course_numbers):
+    """
+    Yield (course_number, raw_data) for the given course numbers that have
+    data for a term, one row at a time rather than all blobs at once.
+    """
+    conn = get_connection()
+    for chunk in _chunks(course_numbers):
+        placeholders = ','.join('?' * len(chunk))
+        yield from conn.execute(
+            f'SELECT course_number, raw_data FROM courses '
+            f'WHERE term = ? AND course_number IN ({placeholders})',
+            (term, *chunk)
+        )
+
+
 def get_all_courses_for_term(term, course_numbers):
     """Get all course data for a term and list of course numbers."""
+    return '\n'.join(raw_data for _, raw_data in iter_courses(term, course_numbers))
+
+
+def get_sections(term, course_codes):
+    """
+    Sections of the given courses ("COMP 2406", ...) for a term, as
+    sections.Section objects, with one indexed query.
+    """
+    pairs = [tuple(code.split()) for code in course_codes if len(code.split()) == 2]
+    if not pairs:
+        return []
+
     conn = get_connection()
     cursor = conn.cursor()
-    placeholders = ','.join('?' * len(course_numbers))
-    cursor.execute(
-        f'SELECT raw_data FROM courses WHERE term = ? AND course_number IN ({placeholders})',
-        (term, *course_numbers)
-    )
-    results = cursor.fetchall()
-    conn.close()
-    return '\n'.join(r[0] for r in results)
+    placeholders = ','.join('(?, ?)' for _ in pairs)
+    # a join (not a row-value IN) so each course is an index lookup on all of
+    # (term, subject, number), rather than a scan of the whole term
+    cursor.execute(f'''
+        WITH wanted(subject, number) AS (VALUES {placeholders})
+        SELECT s.has_number, s.subject, s.number, s.section, s.prof,
+               m.days, m.start_min, m.end_min, m.building, m.first_day, m.last_day
+        FROM wanted w
+        JOIN sections s ON s.term = ? AND s.subject = w.subject AND s.number = w.number
+        JOIN meetings m ON m.section_id = s.id
+        ORDER BY s.id, m.id
+    ''', (*(v for pair in pairs for v in pair), term))
+    return [_section_from_row(row) for row in cursor.fetchall()]
+
+
+def term_sections(term):
+    """Every section stored for a term, as sections.Section objects, in storage order."""
+    cursor = get_connection().cursor()
+    cursor.execute('''
+        SELECT s.has_number, s.subject, s.number, s.section, s.prof,
+               m.days, m.start_min, m.end_min, m.building, m.first_day, m.last_day
+        FROM sections s JOIN meetings m ON m.section_id = s.id
+        WHERE s.term = ?
+        ORDER BY s.id, m.id
+    ''', (term,))
+    return [_section_from_row(row) for row in cursor.fetchall()]
+
+
+# Helper: a Section from a joined sections/meetings row, as selected above
+def _section_from_row(row):
+    (has_number, subject, number, section, prof,
+     days, start, end, building, first_day, last_day) = row
+    dates = None
+    if first_day and last_day:
+        dates = date.fromisoformat(first_day), date.fromisoformat(last_day)
+    return make_section(has_number, f"{subject} {number}", section, prof,
+                        days, start, end, building, dates)
+
+
+def save_session(term, base_url, session_id, cookies):
+    """Remember a session (id and session_cookies() list) for a term and server."""
+    conn = get_connection()
+    with conn:
+        conn.execute('''
+            INSERT OR REPLACE INTO sessions (term, base_url, session_id, cookies, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (term, base_url, session_id, json.dumps(cookies), time.time()))
+
+
+def load_session(term, base_url, max_age):
+    """(session id, cookies) saved for a term and server, unless older than max_age seconds."""
+    conn = get_connection()
+    row = conn.execute(
+        'SELECT session_id, cookies, created_at FROM sessions WHERE term = ? AND base_url = ?',
+        (term, base_url)
+    ).fetchone()
+    if row is None or row[2] < time.time() - max_age:
+        return None
+    return row[0], json.loads(row[1])
+
+
+def delete_session(term, base_url, session_id):
+    """Forget a saved session, if it is still the one saved for the term and server."""
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            'DELETE FROM sessions WHERE term = ? AND base_url = ? AND session_id = ?',
+            (term, base_url, session_id)
+        )
@@ -0,0 +1,259 @@
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
+import requests
+from database import delete_session, load_session, save_courses_bulk, save_session
+from parsing import split_by_course_number
+from search_by_number import (BASE_URL, SessionExpired, course_data_lines, course_search,
+                              create_session, fetch_course_number, join_course_lines,
+                              restore_session, session_cookies)
+
+# ────────────────────────────────────────────────────────────────
+# Concurrent course fetching
+#
+# Several worker threads share a small pool of Carleton Central sessions,
+# saved in the database so later runs can skip setting one up.
+# A token bucket spaces requests out across all workers, so the server sees
+# the same request rate however many workers there are; what concurrency
+# buys is overlapping the latency of requests already in flight.
+#
+# fetch_term/ingest_term instead download a whole term in one search (or one
+# per subject) and split it into the per-course-number blobs the database keeps.
+# ────────────────────────────────────────────────────────────────
+
+RATE         = 1.0    # requests per second, across all workers
+BURST        = 1      # requests allowed back to back after an idle spell
+RETRIES      = 3      # extra attempts after a failed request
+BACKOFF      = 1.0    # seconds before the first retry, doubled each time
+BULK_TIMEOUT = 300    # seconds to wait on a whole-term or whole-subject search
+SESSION_MAX_AGE = 3600  # seconds a saved session is worth trying again
+
+
+class TokenBucket:
+    """Thread-safe token bucket: take() blocks until a token is available."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class SessionPool:
+    """
+    Up to `size` (session, session id) pairs for one term, handed to one
+    worker at a time.
+
+    They all share one server-side session: its id and cookies are set up
+    once (or loaded from the database, if a recent one was saved by an
+    earlier run) and copied into each requests.Session.  When the server
+    rejects it, expire() forgets it and the next acquire() sets up a new one.
+    """
+
+    def __init__(self, term, size, bucket, base_url=None):
+        self.term = term
+        self.size = size
+        self.bucket = bucket
+        self.base_url = base_url
+        self.idle = queue.Queue()
+        self.created = 0
+        self.lock = threading.Lock()
+        self.state_lock = threading.Lock()
+        self.state = None               # (session id, cookies) shared by every session
+
+    def acquire(self):
+        wait = False
+        while True:
+            # once all are handed out, wait for one to come back, re-checking
+            # now and then in case one was discarded meanwhile
+            try:
+                pair = self.idle.get(timeout=1) if wait else self.idle.get_nowait()
+            except queue.Empty:
+                pair = None
+            if pair is not None:
+                if self.state is not None and pair[1] == self.state[0]:
+                    return pair
+                self.discard(pair)      # left over from an expired session
+                continue
+            with self.lock:
+                create = self.created < self.size
+                if create:
+                    self.created += 1
+            if create:
+                break
+            wait = True
+
+        try:
+            sess_id, cookies = self.shared_state()
+        except requests.RequestException:
+            with self.lock:
+                self.created -= 1
+            raise
+        return restore_session(cookies), sess_id
+
+    # The shared (session id, cookies): saved, or set up now
+    def shared_state(self):
+        with self.state_lock:
+            if self.state is None:
+                self.state = load_session(self.term, self.server, SESSION_MAX_AGE)
+            if self.state is None:
+                try:
+                    # setting up a session takes requests too, each with its token
+                    session, sess_id = create_session(self.term, self.base_url,
+                                                      throttle=self.bucket.take)
+                except requests.RequestException:
+                    session = None
+                if session is None:
+                    raise requests.ConnectionError("could not establish a session")
+                self.state = sess_id, session_cookies(session)
+                session.close()
+                save_session(self.term, self.server, *self.state)
+            return self.state
+
+    @property
+    def server(self):
+        return self.base_url or BASE_URL
+
+    def release(self, pair):
+        self.idle.put(pair)
+
+    def discard(self, pair):
+        pair[0].close()
+        with self.lock:
+            self.created -= 1
+
+    def expire(self, pair):
+        """The server rejected pair's session: drop it and forget its id."""
+        self.discard(pair)
+        with self.state_lock:
+            if self.state is not None and self.state[0] == pair[1]:
+                self.state = None
+                delete_session(self.term, self.server, pair[1])
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get_nowait()[0].close()
+
+
+# Run one request: rate-limited, retried with exponential backoff (plus a
+# little jitter) on network errors and HTTP error statuses.
+# request(session, sess_id) does the actual work; label names it in messages.
+def _fetch_one(label, request, pool, bucket, retries, backoff):
+    for attempt in range(retries + 1):
+        try:
+            pair = pool.acquire()
+        except requests.RequestException as e:
+            error = e
+        else:
+            try:
+                bucket.take()
+                result = request(*pair)
+            except SessionExpired as e:
+                # retry on a new session, after the same backoff: a server
+                # blocking us (403) looks like this too, and each new session
+                # costs it two more requests
+                pool.expire(pair)
+                error = e
+            except requests.RequestException as e:
+                pool.release(pair)
+                error = e
+            else:
+                pool.release(pair)
+                return result
+
+        if attempt < retries:
+            delay = backoff * 2 ** attempt * (1 + random.random() / 2)
+            print(f"{label}: {error}; retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    print(f"{label}: giving up after {retries + 1} attempts ({error})")
+    return None
+
+
+# Run request(key, session, sess_id) for every key on a thread pool and yield
+# (key, result or None) in completion order.
+def _fetch_all(keys, term, request, workers, rate, burst, retries, backoff, base_url):
+    keys = list(keys)
+    if not keys:
+        return
+
+    workers = max(1, min(workers, len(keys)))
+    bucket  = TokenBucket(rate, burst)
+    pool    = SessionPool(term, workers, bucket, base_url)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_fetch_one, key or "whole term", partial(request, key),
+                                       pool, bucket, retries, backoff): key
+                       for key in keys}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+    finally:
+        pool.close()
+
+
+def fetch_many(course_numbers, term, *, workers=4, rate=RATE, burst=BURST,
+               retries=RETRIES, backoff=BACKOFF, base_url=None):
+    """
+    Fetch several course numbers concurrently.
+
+    Yields (course_number, course data or None) as each one finishes, in
+    completion order.  base_url overrides search_by_number.BASE_URL, e.g.
+    to run against a local stub server.
+    """
+    def request(course_number, session, sess_id):
+        return fetch_course_number(course_number, term, session, sess_id, base_url=base_url)
+
+    yield from _fetch_all(course_numbers, term, request, workers, rate, burst,
+                          retries, backoff, base_url)
+
+
+def fetch_term(term, subjects=None, *, workers=4, rate=RATE, burst=BURST,
+               retries=RETRIES, backoff=BACKOFF, base_url=None):
+    """
+    Fetch a whole term: one search with no course number, or one per subject
+    code in `subjects`.  Returns {course number: course data}, split the way
+    per-number searches (fetch_many) would return it.  Searches that fail
+    after all retries are reported and left out.
+    """
+    def request(subject, session, sess_id):
+        print(f"Searching {subject or 'all subjects'}...")
+        chunks = course_search(term, session, sess_id, subject=subject,
+                               base_url=base_url, timeout=BULK_TIMEOUT)
+        return split_by_course_number(course_data_lines(chunks))
+
+    keys = subjects or ['']
+    results = dict(_fetch_all(keys, term, request, workers, rate, burst,
+                              retries, backoff, base_url))
+    blobs = {}
+    for key in keys:                    # merge in subject order, not completion order
+        for number, lines in (results[key] or {}).items():
+            blobs.setdefault(number, []).extend(lines)
+    return {number: join_course_lines(lines) for number, lines in blobs.items()}
+
+
+def ingest_term(term, subjects=None, **fetch_options):
+    """
+    Fetch a whole term with fetch_term and store every course number in one
+    transaction.  Returns (number of course numbers stored, the numbers
+    among them whose content is new or changed).
+    """
+    courses = fetch_term(term, subjects, **fetch_options)
+    changed = save_courses_bulk(term, courses.items())
+    return len(courses), changed
@@ -0,0 +1,340 @@
+import re
+from collections import deque
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+from bs4.dammit import EntitySubstitution
+
+try:
+    from lxml import etree
+except ImportError:           # optional: fall back to the streaming extractor
+    etree = None
+
+# ────────────────────────────────────────────────────────────────
+# Table-row extraction
+#
+# Every backend turns an HTML page into the rows of its tables, one string
+# per <tr>, cells joined by tabs and each cell's text pieces stripped and
+# joined by spaces (BeautifulSoup's get_text(separator=' ', strip=True)).
+# Rows come in document order, each once, and only <tr>s inside a <table>
+# with at least one <td>/<th> count.
+#
+#   stream – html.parser events, no tree; mirrors how BeautifulSoup's
+#            html.parser builder nests tags, so output matches "bs4" on any
+#            markup, whole or in chunks.  Memory stays flat: only
+#            unfinished rows are kept.  The default.
+#   lxml   – libxml2, 2-3 times as fast.  Same output on well-formed
+#            pages; on broken markup (e.g. unclosed <td>s or <tr>s) libxml2
+#            repairs nesting the way browsers do, which html.parser does
+#            not, so rows can differ.  Opt-in: set DEFAULT_BACKEND or pass it.
+#   bs4    – the original BeautifulSoup tree walk, kept as the reference.
+#
+# html may be a string or an iterable of string chunks (e.g. a streamed
+# HTTP response); the stream and lxml backends consume chunks as they come.
+# ────────────────────────────────────────────────────────────────
+
+BACKENDS = ("stream", "lxml", "bs4")
+DEFAULT_BACKEND = "stream"
+
+# Text inside these never counts as cell text (BeautifulSoup's string containers)
+HIDDEN_TEXT_TAGS = {"script", "style", "template", "rt", "rp"}
+
+# Elements html.parser never leaves open (BeautifulSoup's empty-element tags)
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "keygen",
+             "link", "menuitem", "meta", "param", "source", "track", "wbr",
+             "basefont", "bgsound", "command", "frame", "image", "isindex",
+             "nextid", "spacer"}
+
+_NUMERIC_REF = re.compile(r'^([0-9]+)(.*)')
+_HEX_REF     = re.compile(r'^([0-9a-fA-F]+)(.*)', re.S)
+
+
+def iter_rows(html, backend=None):
+    """Yield the tab-joined text of every table row of html, in document order."""
+    backend = backend or DEFAULT_BACKEND
+    if backend == "stream":
+        return _stream_rows(html)
+    if backend == "lxml":
+        if etree is None:
+            raise ImportError("the lxml backend needs the lxml package")
+        return _lxml_rows(html)
+    if backend == "bs4":
+        return _bs4_rows(html)
+    raise ValueError(f"unknown HTML backend {backend!r}; expected one of {BACKENDS}")
+
+
+# Helper: a string stays a string, anything else is taken as an iterable of chunks
+def _chunks(html):
+    return (html,) if isinstance(html, str) else html
+
+
+# ─── bs4 ─────────────────────────────────────────────────────────
+
+def _bs4_rows(html):
+    if not isinstance(html, str):
+        html = "".join(html)
+    soup = BeautifulSoup(html, "html.parser")
+    for row in soup.find_all("tr"):
+        if row.find_parent("table") is None:
+            continue
+        cells = row.find_all(["td", "th"])
+        if cells:
+            yield '\t'.join(cell.get_text(separator=' ', strip=True) for cell in cells)
+
+
+# ─── stream ──────────────────────────────────────────────────────
+
+# Helper: text of a numeric character reference, as BeautifulSoup decodes it
+# (HTML spec: bad code points become U+FFFD, C1 controls are read as
+# Windows-1252).  Returns (text, trailing non-reference data).
+def _charref_text(name):
+    base, pattern = 10, _NUMERIC_REF
+    if name[:1] in ("x", "X"):
+        name, base, pattern = name[1:], 16, _HEX_REF
+    try:
+        number, extra = int(name, base), ""
+    except ValueError:
+        match = pattern.search(name)
+        if match is None:
+            return "", name
+        number, extra = int(match.group(1), base), match.group(2)
+
+    if number == 0 or number > 0x10FFFF or 0xD800 <= number <= 0xDFFF:
+        return "�", extra
+    if 0x80 <= number <= 0x9F:
+        try:
+            return bytes([number]).decode("cp1252"), extra
+        except UnicodeDecodeError:
+            pass
+    return chr(number), extra
+
+
+class _RowParser(HTMLParser):
+    """
+    html.parser events → finished rows, without building a tree.
+
+    The stack of open elements follows BeautifulSoup's rules: an end tag
+    closes the most recent open element of that name and everything opened
+    after it, and is ignored if none is open.  Each open element is
+    [name, cell text pieces or None, row or None]; a row is [cells, done].
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.stack = []
+        self.open_names = {}            # name → how many are open
+        self.tables = 0                 # open <table>s
+        self.hidden = 0                 # open HIDDEN_TEXT_TAGS
+        self.cells = 0                  # open <td>/<th>
+        self.open_rows = []             # rows inside a table, still open
+        self.rows = deque()             # rows in start order, not yet yielded
+        self.data = []                  # text since the last tag
+        self.closed_voids = []          # void tags whose stray end tag to ignore
+        self.bailed = False             # see gave_up
+
+    # finished rows, in start order
+    def take_rows(self):
+        while self.rows and self.rows[0][1]:
+            cells = self.rows.popleft()[0]
+            if cells:
+                yield '\t'.join(' '.join(pieces) for pieces in cells)
+
+    # BeautifulSoup's endData: the text since the last tag becomes one string
+    def flush(self, visible=True):
+        if not self.data:
+            return
+        text = "".join(self.data).strip()
+        self.data = []
+        if text and visible and not self.hidden and self.cells:
+            for name, pieces, _ in self.stack:
+                if pieces is not None:
+                    pieces.append(text)
+
+    def push(self, name):
+        pieces = row = None
+        if name in ("td", "th"):
+            pieces = []
+            for open_row in self.open_rows:
+                open_row[0].append(pieces)
+            self.cells += 1
+        elif name == "tr" and self.tables:
+            row = [[], False]
+            self.rows.append(row)
+            self.open_rows.append(row)
+        elif name == "table":
+            self.tables += 1
+        if name in HIDDEN_TEXT_TAGS:
+            self.hidden += 1
+        self.stack.append([name, pieces, row])
+        self.open_names[name] = self.open_names.get(name, 0) + 1
+
+    def pop(self):
+        name, pieces, row = self.stack.pop()
+        self.open_names[name] -= 1
+        if pieces is not None:
+            self.cells -= 1
+        if row is not None:
+            row[1] = True
+            self.open_rows.pop()
+        if name == "table":
+            self.tables -= 1
+        if name in HIDDEN_TEXT_TAGS:
+            self.hidden -= 1
+
+    def pop_to(self, name):
+        if not self.open_names.get(name):
+            return
+        while self.stack:
+            if self.stack[-1][0] == name:
+                self.pop()
+                return
+            self.pop()
+
+    def handle_starttag(self, tag, attrs):
+        self.flush()
+        if tag in VOID_TAGS:
+            self.closed_voids.append(tag)
+        else:
+            self.push(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.flush()
+        self.push(tag)
+        self.pop_to(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.closed_voids:
+            self.closed_voids.remove(tag)
+            return
+        self.flush()
+        self.pop_to(tag)
+
+    def handle_data(self, data):
+        if data == "&#":
+            self.bailed = True
+        self.data.append(data)
+
+    # html.parser stops reading the current feed() at a malformed "&#"
+    # reference (consuming the "&#" if a ";" follows somewhere); fed a whole
+    # page, it only reads on in close().  Only meaningful after feeding up
+    # to a ">", when nothing else can be left over but an unfinished tag,
+    # comment, etc. (starting with "<") or the text of a <script>/<style>.
+    def gave_up(self):
+        return self.bailed or self.rawdata.startswith("&#")
+
+    def handle_charref(self, name):
+        text, extra = _charref_text(name)
+        self.data.append(text)
+        self.data.append(extra)
+
+    def handle_entityref(self, name):
+        self.data.append(EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name, "&" + name))
+
+    # comments, declarations and processing instructions end the current
+    # string and are not cell text themselves, except CDATA sections
+    def handle_comment(self, data):
+        self.flush()
+        self.data.append(data)
+        self.flush(visible=False)
+
+    def handle_decl(self, decl):
+        self.handle_comment(decl)
+
+    def handle_pi(self, data):
+        self.handle_comment(data)
+
+    def unknown_decl(self, data):
+        cdata = data.upper().startswith("CDATA[")
+        self.flush()
+        self.data.append(data[len("CDATA["):] if cdata else data)
+        self.flush(visible=cdata)
+
+
+def _stream_rows(html):
+    parser = _RowParser()
+    chunks = iter(_chunks(html))
+    pending = ""
+    for chunk in chunks:
+        # feed() up to the last ">" only, so nothing html.parser looks at is
+        # cut off at the end of a feed and waits for more
+        pending += chunk
+        cut = pending.rfind(">") + 1
+        if not cut:
+            continue
+        parser.feed(pending[:cut])
+        pending = pending[cut:]
+        yield from parser.take_rows()
+        if parser.gave_up():
+            break
+    rest = pending + "".join(chunks)
+
+    if parser.gave_up():
+        # BeautifulSoup feeds the whole page at once, so html.parser only
+        # gets back to it in close(), with everything left over
+        parser.rawdata += rest
+        if parser.rawdata.startswith("&#") and ";" in parser.rawdata:
+            parser.handle_data("&#")        # what feed() does with a ";" in sight
+            parser.rawdata = parser.rawdata[2:]
+    else:
+        parser.feed(rest)
+    parser.close()
+    parser.flush()
+    while parser.stack:
+        parser.pop()
+    yield from parser.take_rows()
+
+
+# ─── lxml ────────────────────────────────────────────────────────
+
+def _lxml_rows(html):
+    parser = etree.HTMLPullParser(events=("start", "end"),
+                                  tag=("table", "tr", *HIDDEN_TEXT_TAGS))
+    rows = deque()                      # [row element, line or None] in start order
+    tables = 0
+
+    def events():
+        nonlocal tables
+        for event, el in parser.read_events():
+            tag = el.tag
+            if event == "start":
+                if tag == "table":
+                    tables += 1
+                elif tag == "tr" and tables:
+                    rows.append([el, None])
+                continue
+
+            if tag in HIDDEN_TEXT_TAGS:
+                # drop the hidden text itself so itertext() skips it
+                el.clear(keep_tail=True)
+            elif tag == "table":
+                tables -= 1
+            elif tag == "tr":
+                for entry in rows:
+                    if entry[0] is el:
+                        entry[1] = '\t'.join(
+                            ' '.join(text for text in map(str.strip, cell.itertext()) if text)
+                            for cell in el.iter("td", "th"))
+                        break
+            while rows and rows[0][1] is not None:
+                row, line = rows.popleft()
+                if line or row.find(".//td") is not None or row.find(".//th") is not None:
+                    yield line
+                if not rows:
+                    # nothing is waiting on earlier content any more: drop it
+                    _discard_before(row)
+
+    for chunk in _chunks(html):
+        parser.feed(chunk)
+        yield from events()
+    parser.close()
+    yield from events()
+
+
+# Helper: free a finished row and everything before it in its parent
+def _discard_before(row):
+    parent = row.getparent()
+    if parent is None:
+        return
+    while row.getprevious() is not None:
+        del parent[0]
+    row.clear(keep_tail=True)
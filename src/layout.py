@@ -0,0 +1,93 @@
+from typing import NamedTuple
+
+import optimal_schedule as opt
+from optimal_schedule import DAY_TO_INDEX, section_label
+
+# ────────────────────────────────────────────────────────────────
+# Weekly grid layout
+#
+# What a drawing of a schedule shows, worked out without drawing anything:
+# the theme, one Block per day a section meets, in its colour, and the footer
+# listing online asynchronous courses.  plotting draws these with
+# matplotlib; nothing here imports it.
+# ────────────────────────────────────────────────────────────────
+
+FIRST_HOUR = 8      # top of the grid
+LAST_HOUR  = 22     # bottom of the grid
+TITLE = "Your Optimal Weekly Schedule"
+
+
+class Theme(NamedTuple):
+    background: str
+    text:       str
+    normal:     str     # a section as usual
+    forced:     str     # taught by an excluded prof, with no alternative in the course
+    online:     str     # online, with scheduled meeting times
+    grid:       dict    # matplotlib line properties of the hour grid
+    style:      str     # matplotlib style sheet to draw with
+
+
+LIGHT = Theme(background="white", text="black",
+              normal="skyblue", forced="lightcoral", online="lightgreen",
+              grid=dict(color="black", linestyle="--", linewidth=0.8, alpha=0.4),
+              style="default")
+DARK  = Theme(background="#111111", text="white",
+              normal="#3b78ff", forced="#c94c4c", online="lightgreen",
+              grid=dict(color="#444444", linestyle="--", linewidth=0.6, alpha=0.25),
+              style="dark_background")
+
+
+def theme(dark_mode=False):
+    return DARK if dark_mode else LIGHT
+
+
+class Block(NamedTuple):
+    """One section on one day: column, start and length in hours, and what to show."""
+    day:      int       # column, index into sections.DAYS
+    start:    float     # hours since midnight
+    duration: float     # hours
+    kind:     str       # "normal", "forced" or "online" (a Theme colour)
+    lines:    tuple     # label lines: course and section, prof[, location]
+
+
+# Helper: which Theme colour a slot gets, given the courses that have a
+# section taught by an acceptable prof somewhere in the schedule
+def slot_kind(slot, has_good_prof):
+    # colour selection ‑‑ order matters
+    if slot.prof in opt.EXCLUDE_PROFS and not has_good_prof.get(slot.course):
+        return "forced"
+    if slot.is_online_scheduled:
+        return "online"
+    return "normal"
+
+
+def schedule_blocks(schedule, show_location=True):
+    """The Blocks of a schedule, in schedule order."""
+    # does this course appear with an OK professor anywhere?
+    has_good_prof = {s.course: True for s in schedule if s.prof not in opt.EXCLUDE_PROFS}
+
+    blocks = []
+    for slot in schedule:
+        # online asynchronous sections have no time; they go in the footer
+        if slot.start is None or slot.end is None:
+            continue
+
+        location = "Online" if slot.is_online else slot.building
+        lines = (f"{slot.course} {section_label(slot)}", slot.prof)
+        if show_location and location not in ("", "Unknown"):
+            lines += (location,)
+
+        kind = slot_kind(slot, has_good_prof)
+        for day in slot.day_names:
+            if day in DAY_TO_INDEX:
+                blocks.append(Block(DAY_TO_INDEX[day], slot.start / 60,
+                                    (slot.end - slot.start) / 60, kind, lines))
+    return blocks
+
+
+def async_footer(schedule):
+    """The footer line naming the online asynchronous courses, or None if there are none."""
+    courses = {s.course for s in schedule if s.is_online and not s.is_online_scheduled}
+    if not courses:
+        return None
+    return "ONLINE ASYNC COURSES: " + ", ".join(sorted(courses))
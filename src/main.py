@@ -1,65 +1,202 @@
+import argparse
+import contextlib
 import re
-from search_by_number import search_by_course_number, create_session
-from optimal_schedule import optimize_schedule
-from parsing import parse_input_from_db
-from database import init_db, course_exists, save_course, get_all_courses_for_term
+import sys
+import profiling
+from optimal_schedule import FORMATS, optimize_schedule, report_schedules
+from database import init_db, courses_exist_many, save_course, get_sections, stale_courses
 
 # ────────────────────────────────────────────────────────────────
-# INPUT/ADJUSTMENTS
+# DEFAULTS (every one can be overridden on the command line, see --help)
 # ────────────────────────────────────────────────────────────────
 
-COURSES = {""}
-EXCLUDE_PROFS = {""}
-
 # Term codes: last 2 digits determine season
 # 10 = winter, 20 = summer, 30 = fall
 TERM = "202610"  # Winter 2026
 
 SHOW_LOCATION = True
 DARK_MODE = False
+TOP_N = 3  # number of best schedules to print and plot
+FORMAT = "png"  # png/svg/html/ics: print and save, text: print only, json: JSON on stdout
+DPI = 300  # resolution of the PNG plots
+RENDER_WORKERS = None  # processes to plot with (None = a pool only for many plots)
+TIME_BUDGET_MS = None  # stop searching after this many ms (None = exhaustive)
+WORKERS = 1  # processes to search with (None = one per CPU core)
+FETCH_WORKERS = 4  # course searches in flight at once when fetching
+REQUESTS_PER_SECOND = 1.0  # overall request rate limit towards Carleton Central
+BULK_INGEST = False  # on a cache miss, download the whole term in one search
+PIPELINE = False  # parse and optimize each course as its fetch completes
 
 # ────────────────────────────────────────────────────────────────
 
+COURSE_CODE_RE = re.compile(r'([A-Za-z]{4})\s*(\d{4})')
+
+
+# Helper: argparse type for course codes: "COMP 2406", "comp2406" → "COMP 2406"
+def course_code(text):
+    match = COURSE_CODE_RE.fullmatch(text.strip())
+    if match is None:
+        raise argparse.ArgumentTypeError(f"not a course code like 'COMP 2406': {text!r}")
+    return f"{match.group(1).upper()} {match.group(2)}"
+
+
+def fetch_courses(term, courses, *, refresh_stale=False, fetch_workers=FETCH_WORKERS,
+                  rate=REQUESTS_PER_SECOND, bulk=False):
+    """
+    Fetch course data from Carleton Central and save to database.
+    With refresh_stale, also re-download cached courses older than the term's TTL.
+    """
+    course_numbers = list(dict.fromkeys(code.split()[1] for code in courses))
 
-def fetch_courses():
-    """Fetch course data from Carleton Central and save to database."""
-    course_numbers = [re.search(r'\d+', c).group() for c in COURSES if re.search(r'\d+', c)]
-    
     # Check which courses need fetching
-    to_fetch = [num for num in course_numbers if not course_exists(TERM, num)]
-    
+    cached = courses_exist_many(term, course_numbers)
+    to_fetch = [num for num in course_numbers if num not in cached]
+    if refresh_stale:
+        stale = stale_courses(term, cached)
+        to_fetch += [num for num in course_numbers if num in stale]
+
     if not to_fetch:
-        print("All course data already cached")
+        print("All course data already cached" + (" and fresh" if refresh_stale else ""))
         return
-    
-    print(f"Fetching course numbers: {to_fetch}")
-    
-    session, sess_id = create_session(TERM)
-    if session is None:
-        print("Failed to create session")
+
+    from fetcher import fetch_many, ingest_term   # requests & co. only on a cache miss
+
+    if bulk:
+        print(f"Fetching all of term {term}...")
+        stored, changed = ingest_term(term, workers=fetch_workers, rate=rate)
+        print(f"{stored} course numbers stored, {len(changed)} new or changed")
         return
-    
-    for course_num in to_fetch:
-        print(f"Fetching {course_num}...")
-        result = search_by_course_number(course_num, TERM, session, sess_id)
+
+    print(f"Fetching course numbers: {to_fetch}")
+
+    for course_num, result in fetch_many(to_fetch, term, workers=fetch_workers, rate=rate):
         if result:
-            save_course(TERM, course_num, result)
-            print(f"{course_num} done")
+            changed = save_course(term, course_num, result)
+            print(f"{course_num} done" + ("" if changed else " (unchanged)"))
         else:
             print(f"{course_num} failed")
 
 
-def generate_schedule():
-    """Parse course data from database and generate optimal schedule."""
+def generate_schedule(args):
+    """Load parsed sections from database and generate optimal schedule."""
+    with profiling.stage("load"):
+        courses = get_sections(args.term, args.courses)
+    optimize_schedule(courses, show_location=args.show_location, dark_mode=args.dark_mode,
+                      top_n=args.top_n, time_budget_ms=args.time_budget_ms,
+                      workers=args.workers, fmt=args.format, dpi=args.dpi,
+                      render_workers=args.render_workers, term=args.term)
+
+
+def pipelined_schedule(args, log=None):
+    """
+    fetch_courses and generate_schedule in one pass: each course is parsed
+    once, as soon as it arrives, and the optimizer's conflict data is built
+    while the other fetches are still running.  Progress goes to log.
+    """
+    from pipeline import build_catalog
+
+    with contextlib.redirect_stdout(log or sys.stdout):
+        with profiling.stage("catalog"):
+            catalog = build_catalog(args.term, args.courses, refresh_stale=args.refresh_stale,
+                                    workers=args.fetch_workers, rate=args.rate)
+        stats = {}
+        scored = catalog.best_schedules(top_n=args.top_n, stats=stats,
+                                        time_budget_ms=args.time_budget_ms,
+                                        workers=args.workers)
+    report_schedules(scored, stats, show_location=args.show_location,
+                     dark_mode=args.dark_mode, top_n=args.top_n,
+                     time_budget_ms=args.time_budget_ms, fmt=args.format,
+                     dpi=args.dpi, render_workers=args.render_workers, term=args.term)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch course data and generate optimal schedules")
+    parser.add_argument("courses", nargs="+", type=course_code, metavar="COURSE",
+                        help='course codes, e.g. "COMP 2406" COMP2804')
+    parser.add_argument("--term", default=TERM,
+                        help=f"term code; last 2 digits 10=winter, 20=summer, 30=fall "
+                             f"(default {TERM})")
+    parser.add_argument("--exclude-prof", action="append", default=[], metavar="NAME",
+                        help="professor to avoid (repeatable)")
+    parser.add_argument("--top-n", type=int, default=TOP_N,
+                        help=f"number of best schedules to output (default {TOP_N})")
+    parser.add_argument("--format", choices=FORMATS, default=FORMAT,
+                        help="png/svg/html: print the schedules and save them as weekly "
+                             "grids, ics: print them and save them as calendars, "
+                             "text: print them only, json: one JSON document on stdout "
+                             f"(default {FORMAT})")
+    parser.add_argument("--dpi", type=int, default=DPI,
+                        help=f"resolution of the PNG plots (default {DPI})")
+    parser.add_argument("--render-workers", type=int, default=RENDER_WORKERS,
+                        help="processes to plot with (default: this one, or one per "
+                             "CPU core once there are several plots for each)")
+    parser.add_argument("--no-location", dest="show_location", action="store_false",
+                        default=SHOW_LOCATION, help="leave buildings off the plots")
+    parser.add_argument("--dark", dest="dark_mode", action="store_true", default=DARK_MODE,
+                        help="dark theme for the plots")
+    parser.add_argument("--time-budget-ms", type=int, default=TIME_BUDGET_MS,
+                        help="stop searching after this many ms and use the best found so far")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="processes to search with (0 = one per CPU core)")
+    parser.add_argument("--fetch-workers", type=int, default=FETCH_WORKERS,
+                        help=f"course searches in flight at once (default {FETCH_WORKERS})")
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND,
+                        help="overall requests per second towards Carleton Central "
+                             f"(default {REQUESTS_PER_SECOND:g})")
+    parser.add_argument("--bulk", action="store_true", default=BULK_INGEST,
+                        help="on a cache miss, download the whole term in one search")
+    parser.add_argument("--pipeline", action="store_true", default=PIPELINE,
+                        help="parse and optimize each course as its fetch completes")
+    parser.add_argument("--refresh-stale", action="store_true",
+                        help="re-download cached courses older than the term's TTL "
+                             "(see database.TERM_TTLS)")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="write per-stage timings, memory and search counters to "
+                             "FILE as JSON")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="with --profile, trace allocations for exact per-stage "
+                             "memory peaks (slows the run down)")
+    parser.add_argument("--cprofile", metavar="FILE",
+                        help="run the search under cProfile and save its stats to FILE")
+    args = parser.parse_args(argv)
+    if args.workers == 0:
+        args.workers = None
+    return args
+
+
+def run(args, log):
+    init_db()
+    if args.pipeline and not args.bulk:
+        pipelined_schedule(args, log)
+    else:
+        with contextlib.redirect_stdout(log), profiling.stage("fetch"):
+            fetch_courses(args.term, args.courses, refresh_stale=args.refresh_stale,
+                          fetch_workers=args.fetch_workers, rate=args.rate, bulk=args.bulk)
+        generate_schedule(args)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
     import optimal_schedule as opt
-    opt.EXCLUDE_PROFS = EXCLUDE_PROFS
-    
-    course_numbers = [re.search(r'\d+', c).group() for c in COURSES if re.search(r'\d+', c)]
-    courses = parse_input_from_db(COURSES, TERM, course_numbers)
-    optimize_schedule(courses, show_location=SHOW_LOCATION, dark_mode=DARK_MODE)
+    opt.EXCLUDE_PROFS = set(args.exclude_prof)
+
+    # with JSON output, stdout carries the JSON document only
+    log = sys.stderr if args.format == "json" else sys.stdout
+
+    if not (args.profile or args.cprofile):
+        run(args, log)
+        return
+
+    with profiling.profile(memory=args.profile_memory, cprofile=bool(args.cprofile)) as prof:
+        run(args, log)
+    if args.profile:
+        prof.write(args.profile)
+        print(f"Profile saved to {args.profile}", file=log)
+    if args.cprofile:
+        prof.dump_cprofile(args.cprofile)
+        print(f"cProfile stats saved to {args.cprofile}", file=log)
 
 
 if __name__ == "__main__":
-    init_db()
-    fetch_courses()
-    generate_schedule()
+    main()
@@ -1,120 +1,56 @@
 import copy
-import matplotlib
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
+import heapq
+import json
+import math
+import multiprocessing
 import os
 from collections import defaultdict
-from datetime import datetime, time
-from itertools import combinations
-from itertools import product
-matplotlib.use("Agg") # Use non-interactive backend for plotting
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import combinations, repeat
+from time import perf_counter
+
+import profiling
+from sections import DAYS, WEEK_DAYS, Section, format_minutes, section_from_record
 
-DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri"]
 DAY_TO_INDEX = {day: i for i, day in enumerate(DAYS)}
-ONLINE_BUILDING = "ON"
 
-def _preferred_mains(mains):
+# Score weights (see score_schedule)
+DAY_PENALTY   = 1000        # per campus day
+EARLY_PENALTY = 20          # per section starting before EARLY_CUTOFF
+EARLY_CUTOFF  = 9 * 60      # minutes since midnight
+
+def _preferred_mains(mains, exclude=None):
     """
     Return a tuple (usable, force_flag).
 
     * usable – list of lecture slots we are allowed to schedule
     * force_flag – True  ⇢ every lecture is taught by an excluded prof
                    False ⇢ at least one good prof exists
+
+    exclude – professors to avoid (default EXCLUDE_PROFS)
     """
-    good = [m for m in mains if m['prof'] not in EXCLUDE_PROFS]
+    exclude = EXCLUDE_PROFS if exclude is None else exclude
+    good = [m for m in mains if m.prof not in exclude]
     if good:                       # at least one acceptable professor
         return good, False
-    # ‑‑ no alternative, keep the originals but mark them -------------
-    for m in mains:
-        m['forced_excluded'] = True
+    # ‑‑ no alternative, keep the originals (plot_schedule colours them) ---
     return mains, True
 
 
-# Helper: Convert "10:05 - 11:25" to (time(10,5), time(11,25))
-def parse_time_range(time_str):
-    if " - " not in time_str:
-        # Handle missing or malformed time strings
-        return None, None
-
-    start_str, end_str = time_str.split(" - ")
-    try:
-        start = datetime.strptime(start_str.strip(), "%H:%M").time()
-        end = datetime.strptime(end_str.strip(), "%H:%M").time()
-        return start, end
-    except ValueError:
-        return None, None
-
-# Helper: Convert "Mon Wed" → ["Mon", "Wed"]
-def parse_days(days_str):
-    return days_str.strip().split()
-
 # Helper: Check for time conflict on the same day
 def times_overlap(slot1, slot2):
-    # If either slot is online, they can't conflict
-    if not slot1['start'] or not slot2['start']:
-        return False
-
-    for day in slot1['days']:
-        if day in slot2['days']:
-            if not (slot1['end'] <= slot2['start'] or slot2['end'] <= slot1['start']):
-                return True
-    return False
+    # online async slots have an empty mask, so they never conflict
+    return bool(slot1.mask & slot2.mask)
 
 # Build structured slots
+# (course_list may hold parsed rows or ready-made Sections, e.g. from the database)
 def build_slots(course_list):
     slots = []
     for item in course_list:
-        (has_number, course_code, section,
-         prof, days_str, time_str, building) = item
-
-        if prof in ("No No", "Yes Yes", "term course"):
-            prof = "N/A"
-
-        #  first find out whether this is an ON-LINE offering
-        is_online = (building == ONLINE_BUILDING)
-
-        # normalise the raw strings
-        days_trim  = days_str.strip()
-        time_trim  = time_str.strip()
-
-        # (a) no day / time given  → asynchronous ON-LINE or “Unknown”
-        if days_trim in ("", "Unknown"):
-            days = []                # keep it empty so it never plots
-        else:
-            days = parse_days(days_trim)
-
-        if time_trim in ("", "Unknown"):
-            start, end = None, None  # unscheduled (async) slot
-        else:
-            start, end = parse_time_range(time_trim)
-            if start is None or end is None:
-                # bad clock format → skip *unless* it’s ON-LINE async
-                if not is_online:                      # offline garbage
-                    print(f"Skipping invalid time: {time_trim}"
-                          f" (Course: {course_code} {section})")
-                    continue
-                start, end = None, None
-
-        # ---------------- online flags ----------------
-        is_async             = is_online and start is None and end is None
-        is_online_scheduled  = is_online and not is_async
-
-        #build the slot
-        slot = {
-            'has_number': has_number,
-            'course':     course_code,
-            'section':    section,
-            'prof':       prof,
-            'days':       days,
-            'start':      start,
-            'end':        end,
-            'building':   building,
-            'original':   item,
-            'is_online':            is_online,
-            'is_async':             is_async,
-            'is_online_scheduled':  is_online_scheduled,
-        }
-        slots.append(slot)
+        slot = item if isinstance(item, Section) else section_from_record(item)
+        if slot is not None:
+            slots.append(slot)
     return slots
 
 # Group by course and section prefix
@@ -122,33 +58,17 @@ def group_by_course(slots):
     from collections import defaultdict
     course_groups = defaultdict(list)
     for slot in slots:
-        course_groups[slot['course']].append(slot)
+        course_groups[slot.course].append(slot)
     return course_groups
 
-# Generate all valid schedule combinations
-def generate_valid_schedules(course_groups):
-    course_keys = list(course_groups.keys())
+# Collect the schedulable options of every course: [lecture] or [lecture, tutorial].
+# Courses go in code order, as in pipeline.Catalog and the service, so ties
+# between schedules do not depend on the order the courses were fetched in.
+def build_course_options(course_groups):
     all_course_options = []
 
-    for course in course_keys:
-        sections = course_groups[course]
-        mains_raw = [s for s in sections if not s['has_number']]
-        tutorials       = [s for s in sections if s['has_number']]
-
-        main_sections, forced_only_choice = _preferred_mains(mains_raw)
-
-        course_options = []
-
-        for main in main_sections:
-            # Find matching tutorials for this lecture
-            matching_tutorials = [tut for tut in tutorials if tut['section'].startswith(main['section'])]
-
-            if matching_tutorials:
-                for tut in matching_tutorials:
-                    course_options.append([main, tut])
-            else:
-                # No tutorials for this lecture — allow lecture alone
-                course_options.append([main])
+    for course in sorted(course_groups):
+        course_options = options_for_course(course_groups[course])
 
         if not course_options:
             # If somehow no lectures at all exist, skip course
@@ -156,27 +76,470 @@ def generate_valid_schedules(course_groups):
 
         all_course_options.append(course_options)
 
-    if not all_course_options:
+    return all_course_options
+
+# The options of a single course, given its sections (and the professors to
+# avoid, EXCLUDE_PROFS by default)
+def options_for_course(sections, exclude=None):
+    mains_raw = [s for s in sections if not s.has_number]
+    tutorials       = [s for s in sections if s.has_number]
+
+    main_sections, forced_only_choice = _preferred_mains(mains_raw, exclude)
+
+    course_options = []
+
+    for main in main_sections:
+        # Find matching tutorials for this lecture
+        matching_tutorials = [tut for tut in tutorials if tut.section.startswith(main.section)]
+
+        if matching_tutorials:
+            for tut in matching_tutorials:
+                course_options.append([main, tut])
+        else:
+            # No tutorials for this lecture — allow lecture alone
+            course_options.append([main])
+
+    return course_options
+
+# Helper: one course's options merged into equivalence classes (see below),
+# each expanded back into a representative option with alternatives
+def collapse_options(options, exclude=None):
+    return [option_with_alternatives(members)
+            for members in equivalent_option_classes([options], exclude)[0]]
+
+# Helper: What score_schedule and conflict checks can see of a slot
+def footprint(slot, exclude=None):
+    exclude = EXCLUDE_PROFS if exclude is None else exclude
+    return (slot.days, slot.start, slot.end,
+            slot.is_online_scheduled, slot.prof in exclude)
+
+# Merge each course's options that have the same weekly footprint (and the
+# same excluded-prof status) into classes.  Only the last section of an
+# option may differ within a class (the tutorials of one lecture, or
+# lectures without tutorials): [A, A1] and [B, B1] stay apart, as "A/B" with
+# "A1/B1" would also offer A with B1.  Returns, per course, a list of classes
+# in order of first appearance; each class is a list of options, the first
+# of which stands in for the others during the search.
+def equivalent_option_classes(all_course_options, exclude=None):
+    all_classes = []
+    for options in all_course_options:
+        classes = {}
+        for option in options:
+            key = (tuple(slot.section for slot in option[:-1]),
+                   tuple(footprint(slot, exclude) for slot in option))
+            classes.setdefault(key, []).append(option)
+        all_classes.append(list(classes.values()))
+    return all_classes
+
+# Expand a class back into its representative option.  Slots whose position
+# could be filled by other sections get copied with their alternatives.
+def option_with_alternatives(members):
+    option = []
+    for j, slot in enumerate(members[0]):
+        sections = tuple(dict.fromkeys(m[j].section for m in members))
+        option.append(slot._replace(alternatives=sections) if len(sections) > 1 else slot)
+    return option
+
+# Helper: "A1" or, for a slot with alternatives, "A1/A2/A4"
+def section_label(slot):
+    return "/".join(slot.alternatives or (slot.section,))
+
+# Helper: Occupancy of an option (OR of its slot masks), or None if its own
+# sections clash with each other
+def option_mask(option):
+    occupied = 0
+    for slot in option:
+        if occupied & slot.mask:
+            return None
+        occupied |= slot.mask
+    return occupied
+
+# Helper: Iterate the indices of the set bits of n, lowest first
+def iter_bits(n):
+    while n:
+        low = n & -n
+        yield low.bit_length() - 1
+        n ^= low
+
+class ScheduleSpace:
+    """
+    Conflict data for one request, computed once up front.
+
+    Every schedulable course option ([lecture] or [lecture, tutorial]) is
+    collapsed into a single row holding its combined weekly mask.  Rows are
+    numbered course by course, and conflicts[r] is a bitset of the rows of
+    *other* courses that clash with row r, so checking a candidate against a
+    partial schedule is one lookup in the OR of the chosen rows' conflicts.
+
+    Courses can also be added one at a time with add_course, e.g. as their
+    data arrives, and put in their final order with order_courses.
+    """
+
+    def __init__(self, all_course_options=()):
+        self.course_rows = []   # course -> rows of its usable options
+        self.course_bits = []   # course -> bitset of its rows
+        self.row_of      = []   # course -> {option index: row}
+        self.row_course  = []   # row -> course index
+        self.row_option  = []   # row -> option index within its course
+        self.masks       = []   # row -> weekly occupancy
+        self.conflicts   = []   # row -> bitset of clashing rows of other courses
+        self.row_active  = []   # row -> bitset of days it puts you on campus
+        self.row_early   = []   # row -> number of sections starting before 9
+        self.row_days    = []   # row -> ((day, first start, last end, busy), ...)
+
+        for options in all_course_options:
+            self.add_course(options)
+
+    def add_course(self, options):
+        """Add one course's options as rows after all existing ones; returns its index."""
+        c = len(self.course_rows)
+        earlier = len(self.masks)
+        rows = []
+        for k, option in enumerate(options):
+            mask = option_mask(option)
+            if mask is None:          # lecture and tutorial clash
+                continue
+            rows.append(len(self.masks))
+            self.row_course.append(c)
+            self.row_option.append(k)
+            self.masks.append(mask)
+            self.conflicts.append(0)
+            self._add_score_terms(option)
+        self.course_rows.append(rows)
+        self.course_bits.append(sum(1 << r for r in rows))
+        self.row_of.append({self.row_option[r]: r for r in rows})
+
+        # rows are grouped by course, so only rows added before need comparing
+        for r in rows:
+            mask = self.masks[r]
+            if not mask:
+                continue
+            for q in range(earlier):
+                if mask & self.masks[q]:
+                    self.conflicts[r] |= 1 << q
+                    self.conflicts[q] |= 1 << r
+
+        if profiling.ACTIVE is not None:
+            # one mask test (what times_overlap does) per timed row and earlier row
+            profiling.count("pairs_checked", sum(earlier for r in rows if self.masks[r]))
+            profiling.count("conflicts", sum(bin(self.conflicts[r]).count("1") for r in rows))
+        return c
+
+    def order_courses(self, order):
+        """Renumber courses so course order[i] becomes course i; rows keep their numbers."""
+        self.course_rows = [self.course_rows[c] for c in order]
+        self.course_bits = [self.course_bits[c] for c in order]
+        self.row_of      = [self.row_of[c] for c in order]
+        new_index = {c: i for i, c in enumerate(order)}
+        self.row_course  = [new_index[c] for c in self.row_course]
+
+    def _add_score_terms(self, option):
+        """Record the score_schedule terms of one option as integer minutes."""
+        active = 0
+        early = 0
+        per_day = {}
+        for slot in option:
+            if slot.start is None or slot.end is None:
+                continue
+            start, end = slot.start, slot.end
+            if start < EARLY_CUTOFF:
+                early += 1
+            for d in iter_bits(slot.days):
+                if not slot.is_online_scheduled:
+                    active |= 1 << d
+                first, last, busy = per_day.get(d, (start, end, 0))
+                per_day[d] = (min(first, start), max(last, end), busy + end - start)
+
+        self.row_active.append(active)
+        self.row_early.append(early)
+        self.row_days.append(tuple((d,) + terms for d, terms in sorted(per_day.items())))
+
+    def rows_for(self, combo):
+        """Rows of a combo given as one option index per course."""
+        return [self.row_of[c].get(k) for c, k in enumerate(combo)]
+
+    def is_valid(self, rows):
+        """True if none of the given rows clash with each other."""
+        forbidden = 0
+        for r in rows:
+            if r is None or forbidden >> r & 1:
+                return False
+            forbidden |= self.conflicts[r]
+        return True
+
+# Depth-first search over course options.
+# Yields the option index chosen for every course (in course order) of each
+# conflict-free combination.  The next course placed is always the one with
+# the fewest options still compatible with what is already chosen, and a
+# branch is dropped as soon as any remaining course has none left.
+def iter_valid_combos(space):
+    if not space.course_rows:
+        return
+
+    chosen = [None] * len(space.course_rows)
+
+    def extend(remaining, forbidden):
+        if not remaining:
+            yield tuple(space.row_option[r] for r in chosen)
+            return
+
+        best, best_free, best_count = None, 0, 0
+        for c in remaining:
+            free = space.course_bits[c] & ~forbidden
+            if not free:
+                return
+            count = bin(free).count("1")
+            if best is None or count < best_count:
+                best, best_free, best_count = c, free, count
+
+        rest = [c for c in remaining if c != best]
+        for r in iter_bits(best_free):
+            chosen[best] = r
+            yield from extend(rest, forbidden | space.conflicts[r])
+
+    yield from extend(list(range(len(space.course_rows))), 0)
+
+# Branch-and-bound search for the top_n lowest scores.
+# Walks the same tree as iter_valid_combos, but keeps the score_schedule terms
+# of the partial schedule (campus days, per-day span and busy minutes, early
+# sections) so a complete schedule is scored in O(1).  Sections in a valid
+# schedule never overlap, so a day's gap minutes are its span minus its busy
+# time.  A branch is cut once a lower bound on any completion is worse than
+# the current top_n-th score:
+#   * days: days already used, plus the most new days any remaining course
+#     is forced to add
+#   * gaps: each day's current gap, less the most busy minutes the remaining
+#     courses could still fill it with
+#   * early: early sections already placed, plus each remaining course's minimum
+# where "remaining course" terms only look at its options still compatible.
+# Children are tried cheapest partial score first, so the first schedule found
+# is the greedy one and the bound tightens early.  If a perf_counter() deadline
+# is given the search stops there and keeps what it has found so far;
+# stats['exhaustive'] says whether it covered the whole tree.  fixed_rows
+# restricts the search to the subtree where those rows are already placed, and
+# shared_cutoff (a multiprocessing.Value) lets parallel searches prune against
+# the best top_n-th score any of them has found.
+# Returns [(score, combo)] sorted by score, ties in product order.
+def search_best(space, top_n=3, stats=None, deadline=None, fixed_rows=(),
+                shared_cutoff=None):
+    n_courses = len(space.course_rows)
+    if not n_courses or top_n <= 0 or not space.is_valid(fixed_rows):
+        return []
+
+    n_days  = len(WEEK_DAYS)
+    heap    = []                       # (-score, negated combo); worst on top
+    chosen  = [None] * n_courses
+    counts  = {'nodes': 0, 'pruned_conflict': 0, 'pruned_bound': 0, 'schedules': 0}
+    timed_out = False
+    cutoff    = shared_cutoff.value if shared_cutoff is not None else None
+
+    def extend(remaining, forbidden, active, early, days, gaps):
+        nonlocal timed_out, cutoff
+        counts['nodes'] += 1
+        if not counts['nodes'] % 256:
+            if deadline is not None:
+                timed_out = perf_counter() > deadline
+            if shared_cutoff is not None:
+                cutoff = shared_cutoff.value
+        if timed_out:
+            return
+
+        if not remaining:
+            counts['schedules'] += 1
+            score = bin(active).count("1") * DAY_PENALTY + gaps + early * EARLY_PENALTY
+            entry = (-score, tuple(-space.row_option[r] for r in chosen))
+            if len(heap) < top_n:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+            else:
+                return
+            if shared_cutoff is not None and len(heap) == top_n:
+                with shared_cutoff.get_lock():
+                    shared_cutoff.value = min(shared_cutoff.value, -heap[0][0])
+            return
+
+        best, best_free, best_count = None, 0, 0
+        frees = {}
+        for c in remaining:
+            free = space.course_bits[c] & ~forbidden
+            if not free:
+                counts['pruned_conflict'] += 1
+                return
+            frees[c] = free
+            count = bin(free).count("1")
+            if best is None or count < best_count:
+                best, best_free, best_count = c, free, count
+
+        if len(heap) == top_n or cutoff is not None:
+            new_days = 0
+            min_early = early
+            fill = [0] * n_days
+            for c in remaining:
+                # floors/ceilings over the options of c still compatible
+                course_days, course_early, course_fill = n_days, None, [0] * n_days
+                for r in iter_bits(frees[c]):
+                    course_days = min(course_days,
+                                      bin(space.row_active[r] & ~active).count("1"))
+                    if course_early is None or space.row_early[r] < course_early:
+                        course_early = space.row_early[r]
+                    for d, _, _, busy in space.row_days[r]:
+                        course_fill[d] = max(course_fill[d], busy)
+                new_days = max(new_days, course_days)
+                min_early += course_early
+                for d in range(n_days):
+                    fill[d] += course_fill[d]
+            min_gaps = 0
+            for d, state in enumerate(days):
+                if state is not None:
+                    first, last, busy = state
+                    min_gaps += max(0, last - first - busy - fill[d])
+            bound = ((bin(active).count("1") + new_days) * DAY_PENALTY
+                     + min_gaps + min_early * EARLY_PENALTY)
+            if cutoff is not None and bound > cutoff:
+                counts['pruned_bound'] += 1
+                return
+            if len(heap) == top_n:
+                worst_score, worst_combo = -heap[0][0], heap[0][1]
+                if bound > worst_score:
+                    counts['pruned_bound'] += 1
+                    return
+                if bound == worst_score:
+                    # a tie only gets in with an earlier combo in product order
+                    lowest = tuple(
+                        space.row_option[(frees[c] & -frees[c]).bit_length() - 1]
+                        if c in frees else space.row_option[chosen[c]]
+                        for c in range(n_courses))
+                    if lowest >= tuple(-k for k in worst_combo):
+                        counts['pruned_bound'] += 1
+                        return
+
+        children = []
+        for r in iter_bits(best_free):
+            row_active, row_early, row_days, row_gaps = _place_row(
+                space, r, active, early, days, gaps)
+            cost = (bin(row_active).count("1") * DAY_PENALTY + row_gaps
+                    + row_early * EARLY_PENALTY)
+            children.append((cost, r, row_active, row_early, row_days, row_gaps))
+
+        children.sort(key=lambda child: child[:2])
+        rest = [c for c in remaining if c != best]
+        for _, r, row_active, row_early, row_days, row_gaps in children:
+            chosen[best] = r
+            extend(rest, forbidden | space.conflicts[r],
+                   row_active, row_early, row_days, row_gaps)
+            if timed_out:
+                return
+
+    remaining = list(range(n_courses))
+    forbidden, active, early, days, gaps = 0, 0, 0, [None] * n_days, 0
+    for r in fixed_rows:
+        chosen[space.row_course[r]] = r
+        remaining.remove(space.row_course[r])
+        forbidden |= space.conflicts[r]
+        active, early, days, gaps = _place_row(space, r, active, early, days, gaps)
+
+    extend(remaining, forbidden, active, early, days, gaps)
+
+    if stats is not None:
+        counts['exhaustive'] = not timed_out
+        merge_stats(stats, counts)
+
+    return [(-neg_score, tuple(-k for k in neg_combo))
+            for neg_score, neg_combo in sorted(heap, reverse=True)]
+
+# Helper: Partial-schedule score terms after adding row r
+def _place_row(space, r, active, early, days, gaps):
+    days = list(days)
+    for d, first, last, busy in space.row_days[r]:
+        state = days[d]
+        if state is not None:
+            old_first, old_last, old_busy = state
+            gaps -= old_last - old_first - old_busy
+            first = min(first, old_first)
+            last  = max(last, old_last)
+            busy += old_busy
+        gaps += last - first - busy
+        days[d] = (first, last, busy)
+
+    return active | space.row_active[r], early + space.row_early[r], days, gaps
+
+# Helper: Add one run's search counters into stats
+def merge_stats(stats, counts):
+    for key, value in counts.items():
+        if key == 'exhaustive':
+            stats[key] = stats.get(key, True) and value
+        else:
+            stats[key] = stats.get(key, 0) + value
+
+# ── parallel search ───────────────────────────────────────────────
+# The tree is split into shards by fixing the options of the one or two
+# courses with the most options.  Every worker process receives the
+# ScheduleSpace (plain ints and tuples) once, keeps its own top_n per shard,
+# and the shard results are merged on (score, combo), so the outcome is
+# identical to search_best.  Workers also publish their top_n-th score: any
+# of them is an upper bound on the final one, so all shards can prune on the
+# lowest.
+
+_worker_space  = None
+_worker_cutoff = None
+
+def _init_worker(space, cutoff):
+    global _worker_space, _worker_cutoff
+    _worker_space  = space
+    _worker_cutoff = cutoff
+
+def _search_shard(fixed_rows, top_n, deadline):
+    stats = {}
+    best = search_best(_worker_space, top_n, stats, deadline, fixed_rows,
+                       _worker_cutoff)
+    return best, stats
+
+# Prefixes of compatible rows that together cover the whole search tree
+def shard_rows(space, min_shards):
+    largest = sorted(range(len(space.course_rows)),
+                     key=lambda c: -len(space.course_rows[c]))
+    shards = [()]
+    for c in largest[:2]:
+        shards = [prefix + (r,) for prefix in shards for r in space.course_rows[c]
+                  if space.is_valid(prefix + (r,))]
+        if len(shards) >= min_shards:
+            break
+    return shards
+
+def search_best_parallel(space, top_n=3, stats=None, deadline=None, workers=None):
+    if not space.course_rows or top_n <= 0:
         return []
 
-    # Try all combinations of course options
-    all_combos = product(*all_course_options)
-    valid_schedules = []
-
-    for combo in all_combos:
-        flat = [s for group in combo for s in group]  # flatten all sections
-        conflict = False
-        for i in range(len(flat)):
-            for j in range(i + 1, len(flat)):
-                if times_overlap(flat[i], flat[j]):
-                    conflict = True
-                    break
-            if conflict:
-                break
-        if not conflict:
-            valid_schedules.append(flat)
-
-    return valid_schedules
+    workers = workers or os.cpu_count() or 1
+    shards = shard_rows(space, 4 * workers)
+    cutoff = multiprocessing.Value('d', float('inf'))
+    found = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(space, cutoff)) as pool:
+        for best, shard_stats in pool.map(_search_shard, shards,
+                                          repeat(top_n), repeat(deadline)):
+            found.extend(best)
+            if stats is not None:
+                merge_stats(stats, shard_stats)
+
+    found.sort()
+    return found[:top_n]
+
+# Flatten a combo of option indices into its list of sections
+def combo_to_schedule(all_course_options, combo):
+    return [s for c, k in enumerate(combo) for s in all_course_options[c][k]]
+
+# Generate all valid schedule combinations
+def generate_valid_schedules(course_groups):
+    all_course_options = build_course_options(course_groups)
+    space = ScheduleSpace(all_course_options)
+
+    # sorted() restores the order itertools.product would have produced
+    valid = [combo_to_schedule(all_course_options, combo)
+             for combo in sorted(iter_valid_combos(space))]
+    profiling.count("valid_schedules", len(valid))
+    return valid
 
 # Score Formula: (#days * 1000) + total_gap_minutes + early class penalty + prof
 # Lower Score is better
@@ -187,209 +550,200 @@ def score_schedule(schedule):
     prof_penalty = 0
 
     for slot in schedule:
-        if not slot['start'] or not slot['end']:
+        if slot.start is None or slot.end is None:
             continue
 
-        if slot['start'].hour < 9:
-            early_penalty += 20
+        if slot.start < EARLY_CUTOFF:
+            early_penalty += EARLY_PENALTY
 
-        # if slot['prof'] in AVOID_PROFS:
+        # if slot.prof in AVOID_PROFS:
         #     prof_penalty += 1000
 
-        for day in slot['days']:
-            daily_slots[day].append(slot)
+        for d in iter_bits(slot.days):
+            daily_slots[d].append(slot)
 
     active_days = 0
     for day, slots in daily_slots.items():
-        if any(not s['is_online_scheduled'] for s in slots):
+        if any(not s.is_online_scheduled for s in slots):
             active_days += 1
 
         # gaps are still relevant whenever >=2 scheduled things share that day
-        slots.sort(key=lambda x: x['start'])
+        slots.sort(key=lambda x: x.start)
         for i in range(len(slots) - 1):
-            gap = (datetime.combine(datetime.today(), slots[i + 1]['start']) -
-                   datetime.combine(datetime.today(), slots[i    ]['end']))
-            total_gap_minutes += max(0, gap.total_seconds() / 60)
+            total_gap_minutes += max(0, slots[i + 1].start - slots[i].end)
+
+    return active_days * DAY_PENALTY + total_gap_minutes + early_penalty + prof_penalty
+
+# Best top_n schedules as (score, schedule) pairs, lowest score first.
+# Only top_n candidates are held at a time, and ties go to the combo
+# itertools.product would have reached first, which is the order a stable sort
+# of every valid schedule used to give.
+# If a stats dict is given, the search counters are added to it.  With a
+# time_budget_ms the search returns the best schedules found within that budget.
+# workers > 1 (or None, one per CPU core) spreads the search over processes.
+# With collapse, sections that are interchangeable for scoring are searched
+# once and reported as alternatives of each other (see section_label).
+def best_schedules(course_groups, top_n=3, stats=None, time_budget_ms=None, workers=1,
+                   collapse=True):
+    deadline = None
+    if time_budget_ms is not None:
+        deadline = perf_counter() + time_budget_ms / 1000
+
+    with profiling.stage("build_options"):
+        all_course_options = build_course_options(course_groups)
+        if collapse:
+            all_course_options = [collapse_options(options) for options in all_course_options]
+    with profiling.stage("build_space"):
+        space = ScheduleSpace(all_course_options)
+    return search_space(space, all_course_options, top_n, stats, deadline, workers)
+
+# The search half of best_schedules, for a ScheduleSpace built from
+# all_course_options (e.g. course by course as data arrives).  Under an active
+# profiling.Profile the search is its "search" stage (run under cProfile if
+# asked for; with workers > 1 that only sees this process) and its stats are
+# added to the counters.
+def search_space(space, all_course_options, top_n=3, stats=None, deadline=None, workers=1):
+    if profiling.ACTIVE is not None:
+        if stats is None:
+            stats = {}
+        # what enumerating every combination would have to go through
+        profiling.count("product_space", math.prod(len(rows) for rows in space.course_rows))
+
+    with profiling.stage("search", cprofile=True):
+        if workers == 1:
+            best = search_best(space, top_n, stats, deadline)
+        else:
+            best = search_best_parallel(space, top_n, stats, deadline, workers)
+
+    if profiling.ACTIVE is not None:
+        # schedules_reached: complete (conflict-free) schedules the search got
+        # to and scored, not every valid schedule: pruned branches hold more
+        for key, counter in (('nodes', 'search_nodes'), ('pruned_conflict', 'pruned_conflict'),
+                             ('pruned_bound', 'pruned_bound'), ('schedules', 'schedules_reached')):
+            profiling.count(counter, stats.get(key, 0))
 
-    return active_days * 1000 + total_gap_minutes + early_penalty + prof_penalty
+    return [(score, combo_to_schedule(all_course_options, combo))
+            for score, combo in best]
 
 # Format for display
+def format_slot(s):
+    return (f"{s.course} {section_label(s)} | {s.prof} | Days: {' '.join(s.day_names)}"
+            f" | Time: {format_minutes(s.start)} - {format_minutes(s.end)}")
+
+# Helper: Display order – by day names, then start time
+def display_order(schedule):
+    return sorted(schedule, key=lambda x: (x.day_names, -1 if x.start is None else x.start))
+
 def display_schedule(schedule):
     print("\n--- Optimal Schedule ---")
-    for s in sorted(schedule, key=lambda x: (x['days'], x['start'])):
-        print(f"{s['course']} {s['section']} | {s['prof']} | Days: {' '.join(s['days'])} | Time: {s['start']} - {s['end']}")
+    for s in display_order(schedule):
+        print(format_slot(s))
 
 # Display top 3 schedules
 def display_top_schedules(scored_schedules, top_n=3):
     for idx, (score, sched) in enumerate(scored_schedules[:top_n]):
         print(f"\n--- Schedule #{idx + 1} | Score: {score:.2f} ---")
-        for s in sorted(sched, key=lambda x: (x['days'], x['start'])):
-            print(f"{s['course']} {s['section']} | {s['prof']} | Days: {' '.join(s['days'])} | Time: {s['start']} - {s['end']}")
-
-def plot_schedule(schedule, *, show_location=True, dark_mode=False, outfile=None):
-    # does this course appear with an OK professor anywhere?
-    has_good_prof = {s['course']: (s['prof'] not in EXCLUDE_PROFS)
-                     for s in schedule if s['prof'] not in EXCLUDE_PROFS}
-    
-    async_courses = [] 
-
-    # ----------------------------------------------------------------
-    # colours & style
-    # ----------------------------------------------------------------
-    if dark_mode:
-        plt.style.use("dark_background")
-        bg_colour      = "#111111"
-        text_colour    = "white"
-        normal_colour  = "#3b78ff"
-        forced_colour  = "#c94c4c"
-        online_colour  = "lightgreen"
-        grid_kwargs    = dict(color="#444444", linestyle="--",
-                              linewidth=0.6, alpha=0.25)
-    else:
-        bg_colour      = "white"
-        text_colour    = "black"
-        normal_colour  = "skyblue"
-        forced_colour  = "lightcoral"
-        online_colour  = "lightgreen"
-        grid_kwargs    = dict(color="black", linestyle="--",
-                              linewidth=0.8, alpha=0.4)
-
-    fig, ax = plt.subplots(figsize=(12, 9), facecolor=bg_colour)   # ← was (10, 8)
-    ax.set_facecolor(bg_colour)
-
-    # grid & axes -----------------------------------------------------
-    ax.set_xlim(0, 5)
-    ax.set_ylim(8, 22)
-    ax.invert_yaxis()
-
-    ax.set_xticks(range(5))
-    ax.set_xticklabels(DAYS, color=text_colour)
-    ax.set_yticks(range(8, 23))
-    ax.set_yticklabels([f"{h:02d}:00" for h in range(8, 23)], color=text_colour)
-
-    ax.set_axisbelow(True)          # make sure grid stays *under* rectangles
-    ax.grid(True, **grid_kwargs)
-
-    # slots -----------------------------------------------------------
-    for slot in schedule:
-        # A-sync ON-LINE: skip plotting but remember the course
-        if slot['is_online'] and not slot['is_online_scheduled']:
-            async_courses.append(slot['course'])      # or f"{slot['course']} {slot['section']}"
-            continue
-
-        # anything else that still has no time (rare offline “Unknown”) – ignore
-        if slot['start'] is None or slot['end'] is None:
-            continue
-
-        course       = f"{slot['course']} {slot['section']}"
-        start_hour   = slot['start'].hour + slot['start'].minute / 60
-        end_hour     = slot['end'].hour   + slot['end'].minute   / 60
-        duration     = end_hour - start_hour
-
-        # colour selection ‑‑ order matters
-        if slot['prof'] in EXCLUDE_PROFS and not has_good_prof.get(slot['course']):
-            fill_colour = forced_colour
-        elif slot['is_online_scheduled']:
-            fill_colour = online_colour
-        else:
-            fill_colour = normal_colour
-
-        for day in slot['days']:
-            if day not in DAY_TO_INDEX:
-                continue
-            x = DAY_TO_INDEX[day]
-            rect = patches.Rectangle((x, start_hour), 0.95, duration,
-                                     color=fill_colour,
-                                     edgecolor=text_colour,
-                                     linewidth=1.2)
-            ax.add_patch(rect)
-
-            if slot['is_online']:
-                location = "Online"
-            else:
-                location = slot['building']
-
-            if show_location and location not in ("", "Unknown"):
-                label = f"{course}\n{slot['prof']}\n{location}"
-            else:
-                label = f"{course}\n{slot['prof']}"
-
-            ax.text(x + 0.02, start_hour + duration / 2,
-                    label, va="center", ha="left",
-                    fontsize=9, color=text_colour)
-            
-    # ── AFTER the rectangles are done ─────────────────────────
-    ax.set_title("Your Optimal Weekly Schedule", color=text_colour)
-
-    plt.tight_layout(rect=[0, 0.07, 1, 1])
-
-    if async_courses:
-        label = "ONLINE ASYNC COURSES: " + ", ".join(sorted(set(async_courses)))
-        fig.text(0.01, 0.02,                       # x=1 % from left, y=2 % up
-                 label,
-                 ha="left", va="bottom",
-                 fontsize=11, color=text_colour)
-        
-    # Get the absolute path to the script's directory
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-
-    # Set up the schedules directory parallel to 'src' (project root / schedules)
-    project_root = os.path.dirname(script_dir)
-    save_dir = os.path.join(project_root, "schedules")
-    os.makedirs(save_dir, exist_ok=True)       # create if it’s missing
-
-    # save only if caller asks
-    if outfile is not None:
-        # Remove any leading "schedules/" or os.sep from outfile
-        outfile_rel = outfile
-        if outfile_rel.startswith("schedules" + os.sep):
-            outfile_rel = outfile_rel[len("schedules" + os.sep):]
-        elif outfile_rel.startswith("schedules/"):
-            outfile_rel = outfile_rel[len("schedules/"):]
-        outfile_rel = outfile_rel.lstrip(os.sep)
-
-        outfile_path = os.path.join(save_dir, outfile_rel)
-        os.makedirs(os.path.dirname(outfile_path), exist_ok=True)
-        fig.savefig(outfile_path, dpi=300, bbox_inches="tight")
-        print(f"Saved {outfile_path}")
-
-
-    plt.show()
+        for s in display_order(sched):
+            print(format_slot(s))
+
+# JSON-friendly form of one scored schedule, sections in display order
+def schedule_to_dict(score, schedule):
+    return {
+        "score": score,
+        "sections": [{
+            "course":   s.course,
+            "section":  section_label(s),
+            "prof":     s.prof,
+            "days":     list(s.day_names),
+            "start":    None if s.start is None else format_minutes(s.start),
+            "end":      None if s.end is None else format_minutes(s.end),
+            "building": s.building,
+            "online":   s.is_online,
+        } for s in display_order(schedule)],
+    }
+
+# Plot a schedule to a PNG (see plotting.plot_schedule); matplotlib is only
+# imported the first time a plot is made
+def plot_schedule(schedule, *, show_location=True, dark_mode=False, outfile=None, dpi=300):
+    from plotting import plot_schedule as plot
+    plot(schedule, show_location=show_location, dark_mode=dark_mode, outfile=outfile, dpi=dpi)
+
+# Output formats of report_schedules
+FORMATS = ("png", "svg", "html", "ics", "text", "json")
 
 # Main function
-def optimize_schedule(course_list, *, show_location=True, dark_mode=False):
-    slots          = build_slots(course_list)
-    course_groups  = group_by_course(slots)
-    valid_schedules = generate_valid_schedules(course_groups)
+# Returns (scored, exhaustive): the best schedules as (score, schedule) pairs,
+# and False if time_budget_ms ran out before the whole search space was covered.
+def optimize_schedule(course_list, *, show_location=True, dark_mode=False, top_n=3,
+                      time_budget_ms=None, workers=1, fmt="png", dpi=300, render_workers=None,
+                      term=None):
+    with profiling.stage("build_slots"):
+        slots          = build_slots(course_list)
+        course_groups  = group_by_course(slots)
+    stats          = {}
+    scored         = best_schedules(course_groups, top_n=top_n, stats=stats,
+                                    time_budget_ms=time_budget_ms, workers=workers)
+    report_schedules(scored, stats, show_location=show_location, dark_mode=dark_mode,
+                     top_n=top_n, time_budget_ms=time_budget_ms, fmt=fmt,
+                     dpi=dpi, render_workers=render_workers, term=term)
+    return scored, stats.get('exhaustive', True)
+
+# Output the best schedules (the output half of optimize_schedule):
+#   png  – print the search stats and the schedules, and plot them into a new
+#          run folder at dpi, on render_workers processes (see
+#          plotting.render_schedules)
+#   svg, html, ics – the same, but written with writers.write_schedules, no
+#          matplotlib involved (ics needs the term for its dates)
+#   text – the same without any files
+#   json – one JSON document with the schedules and search stats, nothing else
+def report_schedules(scored, stats, *, show_location=True, dark_mode=False, top_n=3,
+                     time_budget_ms=None, fmt="png", dpi=300, render_workers=None,
+                     term=None):
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown output format {fmt!r}; expected one of {FORMATS}")
+    exhaustive = stats.get('exhaustive', True)
+
+    if fmt == "json":
+        print(json.dumps({
+            "schedules":  [schedule_to_dict(score, sched) for score, sched in scored[:top_n]],
+            "exhaustive": exhaustive,
+            "stats":      stats,
+        }, indent=2))
+        return
 
-    if not valid_schedules:
+    if stats:
+        print(f"Searched {stats['nodes']} nodes: "
+              f"{stats['pruned_conflict']} pruned by conflicts, "
+              f"{stats['pruned_bound']} pruned by score bound, "
+              f"{stats['schedules']} schedules scored")
+    if not exhaustive:
+        print(f"Time budget of {time_budget_ms} ms ran out; "
+              "showing the best schedules found so far")
+
+    if not scored:
         print("No valid schedules found.")
         return
 
-    scored = sorted(
-        ((score_schedule(s), s) for s in valid_schedules),
-        key=lambda x: x[0]
-    )
-
-    display_top_schedules(scored, top_n=3)
+    display_top_schedules(scored, top_n=top_n)
+    if fmt == "text":
+        return
 
     # make a run folder inside ../schedules/ (parallel to src)
     script_dir   = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(script_dir)
-    root_dir_abs = os.path.join(project_root, "schedules")
     ts           = datetime.now().strftime("%Y%m%d_%H%M%S")
-    run_dir_rel  = os.path.join("schedules", ts)
-    run_dir_abs  = os.path.join(root_dir_abs, ts)
-    print(f"\nSaving plots in {run_dir_abs}\n")
-
-    # plot & save the 3 best schedules
-    for idx, (score, sched) in enumerate(scored[:3], start=1):
-        fname   = f"schedule{idx}_{int(score)}.png"
-        outfile = os.path.join(run_dir_rel, fname)
-        plot_schedule(sched,
-                      show_location=show_location,
-                      dark_mode=dark_mode,
-                      outfile=outfile)
+    run_dir_abs  = os.path.join(project_root, "schedules", ts)
+    print(f"\nSaving schedules in {run_dir_abs}\n")
+
+    with profiling.stage("render"):
+        if fmt == "png":
+            from plotting import render_schedules   # matplotlib only for PNG output
+            render_schedules(scored[:top_n], run_dir_abs, show_location=show_location,
+                             dark_mode=dark_mode, dpi=dpi, workers=render_workers)
+        else:
+            from writers import write_schedules
+            write_schedules(scored[:top_n], run_dir_abs, fmt, show_location=show_location,
+                            dark_mode=dark_mode, term=term)
 
 EXCLUDE_PROFS = set()
 AVOID_PROFS = EXCLUDE_PROFS
\ No newline at end of file
@@ -1,95 +1,157 @@
 import re
+from collections import deque
 from pprint import pprint
-from database import get_course
 
+import profiling
+from database import iter_courses
 
-def parse_input_from_db(wanted_courses, term, course_numbers):
+# Course rows: "... 12345 ... COMP 2406 A ... Prof Name"
+CRN_RE        = re.compile(r'\b(\d{5})\b')
+COURSE_RE     = re.compile(r'([A-Z]{4})\s+(\d{4})\s+([A-Z]+\d*)')
+DIGIT_RE      = re.compile(r'\d')
+NOT_PROF_RE   = re.compile(r'(Meeting|Date|Yes|No|Lecture|Tutorial|Lab|\.5|^0$|\d{5})')
+
+# Meeting lines: "Meeting Date: Jan 07, 2026 to Apr 08, 2026 Days: Mon Wed Time: 10:05 - 11:25
+#                 Building: HP Room: ..."
+DATES_RE      = re.compile(r'Meeting Date:\s*([A-Za-z]+ \d{1,2}, \d{4}\s+to\s+'
+                           r'[A-Za-z]+ \d{1,2}, \d{4})')
+DAYS_RE       = re.compile(r'Days:\s*([A-Za-z ]*?)\s*Time:')
+TIME_RE       = re.compile(r'Time:\s*([\d:\- ]+)')
+BUILDING_RE   = re.compile(r'Building:\s*([^R]+?)\s*Room:')
+
+# A row's meeting details are on the row itself or one of the next 3 lines
+MEETING_WINDOW = 4
+
+
+def parse_input_from_db(wanted_courses, term, course_numbers, debug=False):
     """
     Parse course data from database.
-    Returns list of: [has_number, course_code, section, prof, days, time, building]
+    Returns list of: [has_number, course_code, section, prof, days, time, building, dates]
     """
-    all_lines = []
-    for num in course_numbers:
-        data = get_course(term, num)
+    return parse_lines(wanted_courses, _db_lines(term, course_numbers), debug=debug)
+
+
+def parse_file(wanted_courses, path, debug=False):
+    """Parse course data from a text dump on disk."""
+    with open(path, encoding='utf-8') as f:
+        return parse_lines(wanted_courses, f, debug=debug)
+
+
+def parse_lines(wanted_courses, lines, debug=False):
+    """Parse course data from lines; pretty-prints the result if debug."""
+    with profiling.stage("parse"):
+        structured_results = list(iter_records(wanted_courses, lines))
+    profiling.count("records_parsed", len(structured_results))
+    if debug:
+        pprint(structured_results)
+    return structured_results
+
+
+def _db_lines(term, course_numbers):
+    for _, data in iter_courses(term, course_numbers):
         if data:
-            all_lines.extend(data.split('\n'))
-    
-    return parse_lines(wanted_courses, all_lines)
+            yield from data.split('\n')
+
+
+def split_by_course_number(lines):
+    """
+    Split search output covering many courses into {course number: lines},
+    the shape the database stores (one blob per number, as a per-number
+    search would return).  Each line goes with the last course row above it.
+    """
+    blobs = {}
+    current = None
+    for line in lines:
+        crn_match = CRN_RE.search(line)
+        course_match = crn_match and COURSE_RE.search(line)
+        if course_match:
+            current = blobs.setdefault(course_match.group(2), [])
+        if current is not None:
+            current.append(line.rstrip('\n'))
+    return blobs
+
+
+def _prof_name(line):
+    for part in reversed(line.split('\t')):
+        part = part.strip()
+        if part and not NOT_PROF_RE.search(part):
+            words = part.split()
+            if len(words) >= 2 and all(w[0].isupper() for w in words if w):
+                return part
+    return "Unknown"
 
 
-def parse_lines(wanted_courses, lines):
-    """Parse course data from lines."""
-    structured_results = []
+def _apply_meeting(record, line):
+    days_match = DAYS_RE.search(line)
+    time_match = TIME_RE.search(line)
+    bldg_match = BUILDING_RE.search(line)
+    date_match = DATES_RE.search(line)
+
+    if days_match:
+        record[4] = days_match.group(1).strip() or "Unknown"
+    if time_match:
+        record[5] = time_match.group(1).strip()
+    if bldg_match:
+        record[6] = bldg_match.group(1).strip()
+    if date_match:
+        record[7] = ' '.join(date_match.group(1).split())
+
+
+def iter_records(wanted_courses, lines):
+    """
+    Yield [has_number, course_code, section, prof, days, time, building,
+    dates] for every wanted course row, in order, reading lines (any
+    iterable of str, e.g. an open file) exactly once.  wanted_courses=None
+    keeps every course.
+    """
+    for _, record in iter_rows(wanted_courses, lines):
+        yield record
+
+
+def iter_rows(wanted_courses, lines):
+    """
+    Like iter_records, but yields (crn, record) pairs.
+
+    A row waits in a small queue until its meeting line turns up or
+    MEETING_WINDOW lines have gone by without one.
+    """
     seen_courses = set()
+    pending = deque()                  # [(crn, record), lines left in its window]
+
+    for raw in lines:
+        line = raw.strip()
+
+        if line:
+            crn_match = CRN_RE.search(line)
+            course_match = crn_match and COURSE_RE.search(line)
+            if course_match:
+                subject, number, section = course_match.groups()
+                course_code = f"{subject} {number}"
+                course_key = f"{course_code} {section}"
+
+                wanted = wanted_courses is None or course_code in wanted_courses
+                if wanted and course_key not in seen_courses:
+                    seen_courses.add(course_key)
+                    has_number = bool(DIGIT_RE.search(section)) or section.endswith('T')
+                    record = [has_number, course_code, section, _prof_name(line),
+                              "Unknown", "Unknown", "Unknown", "Unknown"]
+                    pending.append([(crn_match.group(1), record), MEETING_WINDOW])
 
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip() if isinstance(lines[i], str) else lines[i]
-        
-        if not line:
-            i += 1
+        if not pending:
             continue
 
-        crn_match = re.search(r'\b(\d{5})\b', line)
-        course_match = re.search(r'([A-Z]{4})\s+(\d{4})\s+([A-Z]+\d*)', line)
-        
-        if crn_match and course_match:
-            subject = course_match.group(1)
-            number = course_match.group(2)
-            section = course_match.group(3)
-            course_code = f"{subject} {number}"
-            course_key = f"{course_code} {section}"
-            
-            if course_code not in wanted_courses:
-                i += 1
-                continue
-            if course_key in seen_courses:
-                i += 1
-                continue
-            seen_courses.add(course_key)
-            
-            has_number = bool(re.search(r'\d', section)) or section.endswith('T')
-            
-            parts = line.split('\t')
-            prof_name = "Unknown"
-            for part in reversed(parts):
-                part = part.strip()
-                if part and not re.search(r'(Meeting|Date|Yes|No|Lecture|Tutorial|Lab|\.5|^0$|\d{5})', part):
-                    words = part.split()
-                    if len(words) >= 2 and all(w[0].isupper() for w in words if w):
-                        prof_name = part
-                        break
-            
-            days = "Unknown"
-            time_str = "Unknown"
-            building = "Unknown"
-            
-            for j in range(i, min(i + 4, len(lines))):
-                next_line = lines[j].strip() if isinstance(lines[j], str) else lines[j]
-                if 'Meeting Date:' in next_line or 'Days:' in next_line:
-                    days_match = re.search(r'Days:\s*([A-Za-z ]*?)\s*Time:', next_line)
-                    time_match = re.search(r'Time:\s*([\d:\- ]+)', next_line)
-                    bldg_match = re.search(r'Building:\s*([^R]+?)\s*Room:', next_line)
-                    
-                    if days_match:
-                        days = days_match.group(1).strip() or "Unknown"
-                    if time_match:
-                        time_str = time_match.group(1).strip()
-                    if bldg_match:
-                        building = bldg_match.group(1).strip()
-                    break
-            
-            structured_results.append([
-                has_number,
-                course_code,
-                section,
-                prof_name,
-                days,
-                time_str,
-                building
-            ])
-        
-        i += 1
-
-    pprint(structured_results)
-    return structured_results
+        if 'Meeting Date:' in line or 'Days:' in line:
+            # every waiting row takes its details from the first meeting line
+            for (_, record), _ in pending:
+                _apply_meeting(record, line)
+            while pending:
+                yield pending.popleft()[0]
+            continue
+
+        for entry in pending:
+            entry[1] -= 1
+        while pending and pending[0][1] == 0:
+            yield pending.popleft()[0]
+
+    while pending:
+        yield pending.popleft()[0]
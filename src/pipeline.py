@@ -0,0 +1,106 @@
+from time import perf_counter
+
+import profiling
+from database import course_sections, courses_exist_many, get_sections, save_course, stale_courses
+from optimal_schedule import (ScheduleSpace, collapse_options, group_by_course,
+                              options_for_course, search_space)
+
+# ────────────────────────────────────────────────────────────────
+# Pipelined fetch → parse → optimize
+#
+# Instead of fetching every course, then reading it all back from the
+# database and parsing it again, each course's HTML is parsed once as soon as
+# its fetch completes.  The sections are stored and also go straight into an
+# in-memory Catalog, whose ScheduleSpace gains that course's rows and
+# conflicts while the slower fetches are still in flight.  What is left once
+# the last one lands is the search itself.
+# ────────────────────────────────────────────────────────────────
+
+
+class Catalog:
+    """
+    The requested courses' schedulable options, with the ScheduleSpace over
+    them built up one course at a time as their sections become available.
+    Courses outside course_codes ("COMP 2406", ...) are ignored.
+    """
+
+    def __init__(self, course_codes, collapse=True):
+        self.wanted   = {' '.join(code.split()) for code in course_codes
+                         if len(code.split()) == 2}
+        self.collapse = collapse
+        self.space    = ScheduleSpace()
+        self.codes    = []      # course index -> course code
+        self.options  = []      # course index -> its options
+
+    def add_sections(self, sections):
+        """Add every wanted course among sections that is not in the catalog yet."""
+        with profiling.stage("build_space"):
+            for course, group in group_by_course(sections).items():
+                if course not in self.wanted or course in self.codes:
+                    continue
+                options = options_for_course(group)
+                if not options:
+                    continue
+                if self.collapse:
+                    options = collapse_options(options)
+                self.space.add_course(options)
+                self.codes.append(course)
+                self.options.append(options)
+
+    def best_schedules(self, top_n=3, stats=None, time_budget_ms=None, workers=1):
+        """
+        Like optimal_schedule.best_schedules over the catalog.  Courses are
+        put in course code order first, so ties do not depend on which
+        fetch finished first.
+        """
+        deadline = None
+        if time_budget_ms is not None:
+            deadline = perf_counter() + time_budget_ms / 1000
+
+        order = sorted(range(len(self.codes)), key=self.codes.__getitem__)
+        self.space.order_courses(order)
+        self.codes   = [self.codes[c] for c in order]
+        self.options = [self.options[c] for c in order]
+        return search_space(self.space, self.options, top_n, stats, deadline, workers)
+
+
+def build_catalog(term, course_codes, *, refresh_stale=False, collapse=True, **fetch_options):
+    """
+    Catalog of course_codes for a term.  Cached courses come from the
+    database straight away; missing ones (and, with refresh_stale, ones older
+    than the term's TTL) are fetched with fetch_many, saved, and added to
+    the catalog as each arrives.  A course whose fetch fails falls back to
+    whatever the database still has for it.
+    """
+    catalog = Catalog(course_codes, collapse)
+    numbers = list(dict.fromkeys(code.split()[1] for code in sorted(catalog.wanted)))
+
+    cached = courses_exist_many(term, numbers)
+    to_fetch = [num for num in numbers if num not in cached]
+    if refresh_stale:
+        stale = stale_courses(term, cached)
+        to_fetch += [num for num in numbers if num in stale]
+
+    def codes_for(nums):
+        return [code for code in catalog.wanted if code.split()[1] in nums]
+
+    catalog.add_sections(get_sections(term, codes_for(set(numbers) - set(to_fetch))))
+
+    if not to_fetch:
+        print("All course data already cached" + (" and fresh" if refresh_stale else ""))
+        return catalog
+
+    from fetcher import fetch_many   # requests & co. only on a cache miss
+
+    print(f"Fetching course numbers: {to_fetch}")
+
+    for course_num, result in fetch_many(to_fetch, term, **fetch_options):
+        if result:
+            sections = course_sections(result)
+            changed = save_course(term, course_num, result, sections)
+            catalog.add_sections([slot for _, slot in sections])
+            print(f"{course_num} done" + ("" if changed else " (unchanged)"))
+        else:
+            print(f"{course_num} failed")
+            catalog.add_sections(get_sections(term, codes_for({course_num})))
+    return catalog
@@ -0,0 +1,190 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg") # Use non-interactive backend for plotting
+import matplotlib.pyplot as plt
+import matplotlib.patches as patches
+from matplotlib.text import Text
+
+from layout import FIRST_HOUR, LAST_HOUR, TITLE, async_footer, schedule_blocks, theme
+from sections import DAYS
+
+# ────────────────────────────────────────────────────────────────
+# PNG schedule plots
+#
+# Kept out of optimal_schedule so that importing matplotlib (and building
+# its font cache) only happens when a plot is actually asked for.
+#
+# The empty weekly grid is drawn once per Template and each schedule's blocks
+# are added, saved and removed again, instead of building a new figure per
+# plot.  render_schedules can spread the plots over a process pool, one
+# Template per worker; the layout (colours, labels) is worked out up front,
+# so workers only draw.  Starting a worker (and its Template) costs about as
+# much as a couple of plots, so the pool only pays off with several plots per
+# worker: for the usual three schedules one process is faster.
+# ────────────────────────────────────────────────────────────────
+
+DPI     = 300
+FIGSIZE = (12, 9)
+PLOTS_PER_WORKER = 3    # fewest plots per pool worker when workers=None
+LAYOUT_RECT = [0, 0.07, 1, 1]   # tight_layout area, leaving room for the footer
+SUBPLOT_PARAMS = ("left", "right", "bottom", "top", "wspace", "hspace")
+
+
+class Template:
+    """A figure holding the empty weekly grid in one theme; close() when done."""
+
+    def __init__(self, dark_mode=False):
+        self.theme = theme(dark_mode)
+        t = self.theme
+        with plt.style.context(t.style):
+            fig, ax = plt.subplots(figsize=FIGSIZE, facecolor=t.background)
+            ax.set_facecolor(t.background)
+
+            # grid & axes -----------------------------------------------------
+            ax.set_xlim(0, len(DAYS))
+            ax.set_ylim(FIRST_HOUR, LAST_HOUR)
+            ax.invert_yaxis()
+
+            ax.set_xticks(range(len(DAYS)))
+            ax.set_xticklabels(DAYS, color=t.text)
+            ax.set_yticks(range(FIRST_HOUR, LAST_HOUR + 1))
+            ax.set_yticklabels([f"{h:02d}:00" for h in range(FIRST_HOUR, LAST_HOUR + 1)],
+                               color=t.text)
+
+            ax.set_axisbelow(True)          # make sure grid stays *under* rectangles
+            ax.grid(True, **t.grid)
+
+            ax.set_title(TITLE, color=t.text)
+            fig.tight_layout(rect=LAYOUT_RECT)
+        self.fig, self.ax = fig, ax
+
+    def save(self, blocks, footer, path, dpi=DPI):
+        """Draw layout.schedule_blocks() output and a footer line on the grid, save it to path."""
+        t = self.theme
+        artists = []
+        for block in blocks:
+            fill = getattr(t, block.kind)
+            artists.append(self.ax.add_patch(
+                patches.Rectangle((block.day, block.start), 0.95, block.duration,
+                                  facecolor=fill, edgecolor=fill, linewidth=1.2)))
+            artists.append(self.ax.text(block.day + 0.02, block.start + block.duration / 2,
+                                        "\n".join(block.lines), va="center", ha="left",
+                                        fontsize=9, color=t.text))
+        # the grid was laid out empty: a label running past the axes (a long
+        # name in the Fri column) needs the layout redone around it, from the
+        # fresh figure's, as if the labels had been there from the start
+        relayout = self._overflows(artists)
+        if relayout:
+            params = {name: getattr(self.fig.subplotpars, name) for name in SUBPLOT_PARAMS}
+            with plt.style.context(t.style):
+                self.fig.subplots_adjust(**{name: plt.rcParams[f"figure.subplot.{name}"]
+                                            for name in SUBPLOT_PARAMS})
+                self.fig.tight_layout(rect=LAYOUT_RECT)
+        if footer:
+            artists.append(self.fig.text(0.01, 0.02,    # x=1 % from left, y=2 % up
+                                         footer, ha="left", va="bottom",
+                                         fontsize=11, color=t.text))
+        try:
+            with plt.style.context(t.style):
+                self.fig.savefig(path, dpi=dpi, bbox_inches="tight")
+        finally:
+            for artist in artists:
+                artist.remove()
+            if relayout:
+                self.fig.subplots_adjust(**params)
+
+    # Helper: whether any of the artists (texts) reach outside the axes
+    def _overflows(self, artists):
+        renderer = self.fig.canvas.get_renderer()
+        box = self.ax.get_window_extent(renderer)
+        for artist in artists:
+            if isinstance(artist, Text):
+                extent = artist.get_window_extent(renderer)
+                if (extent.x0 < box.x0 or extent.x1 > box.x1
+                        or extent.y0 < box.y0 or extent.y1 > box.y1):
+                    return True
+        return False
+
+    def close(self):
+        plt.close(self.fig)
+
+
+def plot_schedule(schedule, *, show_location=True, dark_mode=False, outfile=None, dpi=DPI):
+    """Plot one schedule; outfile is relative to the schedules/ folder next to src/."""
+    if outfile is None:
+        return
+
+    # Set up the schedules directory parallel to 'src' (project root / schedules)
+    script_dir   = os.path.dirname(os.path.abspath(__file__))
+    save_dir     = os.path.join(os.path.dirname(script_dir), "schedules")
+
+    # Remove any leading "schedules/" or os.sep from outfile
+    outfile_rel = outfile
+    for prefix in ("schedules" + os.sep, "schedules/"):
+        if outfile_rel.startswith(prefix):
+            outfile_rel = outfile_rel[len(prefix):]
+            break
+    outfile_path = os.path.join(save_dir, outfile_rel.lstrip(os.sep))
+    os.makedirs(os.path.dirname(outfile_path), exist_ok=True)
+
+    template = Template(dark_mode)
+    try:
+        template.save(schedule_blocks(schedule, show_location), async_footer(schedule),
+                      outfile_path, dpi)
+    finally:
+        template.close()
+    print(f"Saved {outfile_path}")
+
+
+def render_schedules(scored, run_dir, *, show_location=True, dark_mode=False, dpi=DPI,
+                     workers=None):
+    """
+    Plot (score, schedule) pairs to run_dir/schedule{rank}_{score}.png.
+    workers processes draw them (never more than there are schedules; 1
+    draws in this process).  None also draws in this process, unless there
+    are enough plots to give two or more workers PLOTS_PER_WORKER each; up
+    to one worker per CPU core is then used.  Returns the paths in rank order.
+    """
+    os.makedirs(run_dir, exist_ok=True)
+    jobs = [(schedule_blocks(sched, show_location), async_footer(sched),
+             os.path.join(run_dir, f"schedule{idx}_{int(score)}.png"))
+            for idx, (score, sched) in enumerate(scored, start=1)]
+    paths = [path for _, _, path in jobs]
+    if not jobs:
+        return paths
+
+    if workers is None:
+        workers = min(os.cpu_count() or 1, len(jobs) // PLOTS_PER_WORKER)
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        template = Template(dark_mode)
+        try:
+            for blocks, footer, path in jobs:
+                template.save(blocks, footer, path, dpi)
+                print(f"Saved {path}")
+        finally:
+            template.close()
+        return paths
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(dark_mode, dpi)) as pool:
+        for path in pool.map(_render, jobs):
+            print(f"Saved {path}")
+    return paths
+
+
+# Pool worker state: this process's Template and dpi
+_worker_template = None
+_worker_dpi      = DPI
+
+def _init_worker(dark_mode, dpi):
+    global _worker_template, _worker_dpi
+    _worker_template = Template(dark_mode)
+    _worker_dpi      = dpi
+
+def _render(job):
+    blocks, footer, path = job
+    _worker_template.save(blocks, footer, path, _worker_dpi)
+    return path
@@ -0,0 +1,142 @@
+import contextlib
+import json
+import sys
+import time
+from collections import Counter
+
+try:
+    import resource             # Unix only; no max RSS figures without it
+except ImportError:
+    resource = None
+
+# ────────────────────────────────────────────────────────────────
+# Opt-in instrumentation
+#
+# A Profile records, per named stage, wall and CPU time and memory, plus
+# domain counters (pairs of options checked for clashes, conflicts found,
+# size of the product space, search nodes, schedules reached, ...).  Call
+# sites wrap their work in stage(name) and report counters with count(name, n).
+#
+# Nothing is recorded unless a Profile is ACTIVE (see profile()).  With
+# none, stage() hands back one shared no-op context manager and count()
+# returns straight away; both are only called a handful of times per run,
+# outside the search loops, whose own counters (nodes, prunes) are
+# collected from its stats dict once it is done.
+# ────────────────────────────────────────────────────────────────
+
+ACTIVE = None                   # the Profile being recorded, if any
+
+_NO_STAGE = contextlib.nullcontext()
+
+
+# Helper: high-water mark of this process's resident memory, in KiB
+def max_rss_kib():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss    # macOS reports bytes
+
+
+class Profile:
+    """
+    Stage timings and counters of one run.  With memory, Python allocations
+    are traced (tracemalloc) for exact per-stage peaks, which slows
+    everything down; without it only the process's max RSS is sampled.
+    With cprofile, stages entered with stage(name, cprofile=True) also run
+    under cProfile (see dump_cprofile).
+    """
+
+    def __init__(self, memory=False, cprofile=False):
+        self.memory   = memory
+        self.stages   = {}          # name -> totals, in order of first completion
+        self.counters = Counter()
+        self.cprofile = None
+        self._peaks   = []          # running allocation peaks of the open stages
+        if cprofile:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+
+    @contextlib.contextmanager
+    def stage(self, name, cprofile=False):
+        if self.memory:
+            import tracemalloc
+            alloc_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            self._peaks.append(0)
+        profiler = self.cprofile if cprofile else None
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+            totals = self.stages.setdefault(name, {"calls": 0, "wall_ms": 0.0, "cpu_ms": 0.0})
+            totals["calls"]   += 1
+            totals["wall_ms"] += wall * 1000
+            totals["cpu_ms"]  += cpu * 1000
+            totals["max_rss_kib"] = max_rss_kib()
+
+            if self.memory:
+                alloc_after, peak = tracemalloc.get_traced_memory()
+                # a nested stage reset the peak; it left its own behind in _peaks
+                peak = max(peak, self._peaks.pop())
+                totals["peak_alloc_kib"] = max(totals.get("peak_alloc_kib", 0), peak // 1024)
+                totals["alloc_kib"] = (totals.get("alloc_kib", 0)
+                                       + (alloc_after - alloc_before) // 1024)
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+                tracemalloc.reset_peak()
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def report(self):
+        """The JSON-friendly report: stages in order, counters, process totals."""
+        stages = [{"name": name, **{key: round(value, 3) if isinstance(value, float) else value
+                                    for key, value in totals.items()}}
+                  for name, totals in self.stages.items()]
+        return {"stages": stages, "counters": dict(self.counters),
+                "max_rss_kib": max_rss_kib()}
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def dump_cprofile(self, path):
+        """Save the cProfile data for pstats, snakeviz & co."""
+        self.cprofile.dump_stats(path)
+
+
+@contextlib.contextmanager
+def profile(memory=False, cprofile=False):
+    """Make a new Profile ACTIVE for the duration of the with block, and yield it."""
+    global ACTIVE
+    prof = Profile(memory, cprofile)
+    if memory:
+        import tracemalloc
+        tracemalloc.start()
+    previous, ACTIVE = ACTIVE, prof
+    try:
+        with prof.stage("total"):
+            yield prof
+    finally:
+        ACTIVE = previous
+        if memory:
+            tracemalloc.stop()
+
+
+def stage(name, cprofile=False):
+    """Context manager timing a stage of the ACTIVE Profile; a no-op without one."""
+    if ACTIVE is None:
+        return _NO_STAGE
+    return ACTIVE.stage(name, cprofile)
+
+
+def count(name, n=1):
+    """Add n to a counter of the ACTIVE Profile, if any."""
+    if ACTIVE is not None:
+        ACTIVE.count(name, n)
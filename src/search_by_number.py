@@ -1,9 +1,25 @@
+import itertools
+import os
 import requests
 import time
 import re
 from bs4 import BeautifulSoup
+from html_extract import iter_rows
 
-BASE_URL = "https://central.carleton.ca/prod"
+# Point CU_CENTRAL_URL at e.g. a local stub server to fetch from somewhere else
+BASE_URL = os.environ.get("CU_CENTRAL_URL", "https://central.carleton.ca/prod")
+
+CRN_LINE = re.compile(r'\b\d{5}\b')   # a 5-digit CRN
+
+# What Carleton Central answers with once a session_id is no longer valid
+SESSION_EXPIRED_RE = re.compile(r'session\s+(has\s+)?(expired|timed\s+out)|invalid\s+session', re.I)
+SESSION_EXPIRED_STATUS = {401, 403, 440}
+
+CHUNK_SIZE = 64 * 1024    # bytes of a search response read (and parsed) at a time
+
+
+class SessionExpired(requests.RequestException):
+    """The session (id and cookies) was rejected; set up a new one and retry."""
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -21,13 +37,20 @@ HEADERS = {
 }
 
 
-def create_session(term):
-    """Create and initialize a session for the given term."""
+def create_session(term, base_url=None, throttle=None):
+    """
+    Create and initialize a session for the given term.  That takes two
+    requests; throttle, if given, is called before each (e.g. to take a
+    rate-limit token).
+    """
+    base_url = base_url or BASE_URL
+    throttle = throttle or (lambda: None)
     s = requests.Session()
     s.headers.update(HEADERS)
     
     print("Initializing session...")
-    r = s.get(f"{BASE_URL}/bwysched.p_select_term?wsea_code=EXT", timeout=30)
+    throttle()
+    r = s.get(f"{base_url}/bwysched.p_select_term?wsea_code=EXT", timeout=30)
     soup = BeautifulSoup(r.text, "html.parser")
     sess_input = soup.find("input", {"name": "session_id"})
     
@@ -39,7 +62,8 @@ def create_session(term):
     print(f"Session established: {sess_id}")
 
     print(f"Setting term to {term}...")
-    s.post(f"{BASE_URL}/bwysched.p_search_fields", data={
+    throttle()
+    s.post(f"{base_url}/bwysched.p_search_fields", data={
         "term_code": term, 
         "session_id": sess_id, 
         "wsea_code": "EXT"
@@ -48,7 +72,25 @@ def create_session(term):
     return s, sess_id
 
 
-def search_by_course_number(course_number, term, session=None, sess_id=None):
+def session_cookies(session):
+    """A session's cookies as a list of plain dicts, e.g. to store as JSON."""
+    return [{"name": c.name, "value": c.value, "domain": c.domain, "path": c.path,
+             "secure": c.secure, "expires": c.expires}
+            for c in session.cookies]
+
+
+def restore_session(cookies):
+    """A new session with the standard headers and the given session_cookies()."""
+    s = requests.Session()
+    s.headers.update(HEADERS)
+    for c in cookies:
+        s.cookies.set(c["name"], c["value"], domain=c["domain"], path=c["path"],
+                      secure=c["secure"], expires=c["expires"])
+    return s
+
+
+def search_by_course_number(course_number, term, session=None, sess_id=None,
+                            delay=1, base_url=None):
     """
     Search for a course by course number.
     Returns formatted course data.
@@ -56,78 +98,100 @@ def search_by_course_number(course_number, term, session=None, sess_id=None):
     try:
         # Create session if not provided
         if session is None or sess_id is None:
-            session, sess_id = create_session(term)
+            session, sess_id = create_session(term, base_url)
             if session is None:
                 return None
 
-        time.sleep(1)
-
-        payload = [
-            ('wsea_code', 'EXT'), ('term_code', term), ('session_id', sess_id),
-            ('ws_numb', ''), ('sel_aud', 'dummy'),
-            ('sel_subj', 'dummy'), ('sel_subj', ''), 
-            ('sel_camp', 'dummy'), ('sel_sess', 'dummy'), ('sel_sess', ''),      
-            ('sel_attr', 'dummy'), ('sel_levl', 'dummy'), ('sel_levl', ''),      
-            ('sel_schd', 'dummy'), ('sel_schd', ''),      
-            ('sel_insm', 'dummy'), ('sel_link', 'dummy'), ('sel_wait', 'dummy'),
-            ('sel_day', 'dummy'), ('sel_day', 'm'), ('sel_day', 't'), ('sel_day', 'w'),
-            ('sel_day', 'r'), ('sel_day', 'f'), ('sel_day', 's'), ('sel_day', 'u'),
-            ('sel_begin_hh', 'dummy'), ('sel_begin_hh', '0'),
-            ('sel_begin_mi', 'dummy'), ('sel_begin_mi', '0'),
-            ('sel_begin_am_pm', 'dummy'), ('sel_begin_am_pm', 'a'),
-            ('sel_end_hh', 'dummy'), ('sel_end_hh', '0'),
-            ('sel_end_mi', 'dummy'), ('sel_end_mi', '0'),
-            ('sel_end_am_pm', 'dummy'), ('sel_end_am_pm', 'a'),
-            ('sel_instruct', 'dummy'), ('sel_special', 'dummy'), ('sel_special', 'N'),
-            ('sel_resd', 'dummy'), ('sel_breadth', 'dummy'), 
-            ('sel_number', course_number),
-            ('sel_crn', ''),
-            ('block_button', '')
-        ]
-        
-        print(f"Searching for course number {course_number}...")
-        r = session.post(f"{BASE_URL}/bwysched.p_course_search", data=payload, timeout=30)
-        
-        return parse_course_data(r.text)
+        time.sleep(delay)
+        return fetch_course_number(course_number, term, session, sess_id, base_url)
 
     except Exception as e:
         print(f"Error: {e}")
         return None
 
 
+def fetch_course_number(course_number, term, session, sess_id, base_url=None):
+    """
+    One course search request, without the error handling of
+    search_by_course_number: network errors and HTTP error statuses raise
+    (requests.RequestException) so callers can retry them.
+    """
+    print(f"Searching for course number {course_number}...")
+    return parse_course_data(course_search(term, session, sess_id, number=course_number,
+                                           base_url=base_url))
+
+
+def course_search(term, session, sess_id, number='', subject='', base_url=None, timeout=30):
+    """
+    POST a p_course_search and return the HTML as an iterator of text
+    chunks, read from the connection as they are consumed.  Leaving number
+    and subject empty searches the whole term; raises like
+    fetch_course_number, with SessionExpired if the server no longer
+    accepts the session (told by the status, the URL or the first chunk).
+    """
+    base_url = base_url or BASE_URL
+    payload = [
+        ('wsea_code', 'EXT'), ('term_code', term), ('session_id', sess_id),
+        ('ws_numb', ''), ('sel_aud', 'dummy'),
+        ('sel_subj', 'dummy'), ('sel_subj', subject), 
+        ('sel_camp', 'dummy'), ('sel_sess', 'dummy'), ('sel_sess', ''),      
+        ('sel_attr', 'dummy'), ('sel_levl', 'dummy'), ('sel_levl', ''),      
+        ('sel_schd', 'dummy'), ('sel_schd', ''),      
+        ('sel_insm', 'dummy'), ('sel_link', 'dummy'), ('sel_wait', 'dummy'),
+        ('sel_day', 'dummy'), ('sel_day', 'm'), ('sel_day', 't'), ('sel_day', 'w'),
+        ('sel_day', 'r'), ('sel_day', 'f'), ('sel_day', 's'), ('sel_day', 'u'),
+        ('sel_begin_hh', 'dummy'), ('sel_begin_hh', '0'),
+        ('sel_begin_mi', 'dummy'), ('sel_begin_mi', '0'),
+        ('sel_begin_am_pm', 'dummy'), ('sel_begin_am_pm', 'a'),
+        ('sel_end_hh', 'dummy'), ('sel_end_hh', '0'),
+        ('sel_end_mi', 'dummy'), ('sel_end_mi', '0'),
+        ('sel_end_am_pm', 'dummy'), ('sel_end_am_pm', 'a'),
+        ('sel_instruct', 'dummy'), ('sel_special', 'dummy'), ('sel_special', 'N'),
+        ('sel_resd', 'dummy'), ('sel_breadth', 'dummy'), 
+        ('sel_number', number),
+        ('sel_crn', ''),
+        ('block_button', '')
+    ]
+    
+    r = session.post(f"{base_url}/bwysched.p_course_search", data=payload, timeout=timeout,
+                     stream=True)
+    if r.encoding is None:
+        r.encoding = "utf-8"    # no charset given; r.text would have to read it all to guess
+    chunks = r.iter_content(CHUNK_SIZE, decode_unicode=True)
+    try:
+        # an expired-session page is short: it is all in the first chunk
+        first = next(chunks, "")
+        if (r.status_code in SESSION_EXPIRED_STATUS or 'p_select_term' in r.url
+                or SESSION_EXPIRED_RE.search(first)):
+            raise SessionExpired(f"session {sess_id} expired", response=r)
+        r.raise_for_status()
+    except requests.RequestException:
+        r.close()
+        raise
+    return itertools.chain((first,), chunks)
+
+
 def parse_course_data(html):
     """Parse HTML and extract course data."""
-    soup = BeautifulSoup(html, "html.parser")
-    lines = []
-    seen = set()
-    
-    # Find all table rows
-    for table in soup.find_all("table"):
-        for row in table.find_all("tr"):
-            cells = row.find_all(["td", "th"])
-            if not cells:
-                continue
-            
-            # Get text from each cell
-            row_text = []
-            for cell in cells:
-                text = cell.get_text(separator=' ', strip=True)
-                row_text.append(text)
-            
-            line = '\t'.join(row_text)
-            
-            # Skip duplicates
-            if line in seen:
-                continue
-            
-            # Keep lines that look like course data
-            if any([
-                re.search(r'\b\d{5}\b', line),  # Has a 5-digit CRN
-                'Meeting Date:' in line,
-                'Also Register in:' in line,
-                'Section Information:' in line,
-            ]):
-                seen.add(line)
-                lines.append(line)
-    
+    return join_course_lines(course_data_lines(html))
+
+
+def join_course_lines(lines):
+    """Drop repeated lines and join the rest, or None if there are none."""
+    lines = list(dict.fromkeys(lines))
     return '\n'.join(lines) if lines else None
+
+
+def course_data_lines(html, backend=None):
+    """
+    Yield every table row of the HTML that looks like course data, repeats
+    included.  html may also be an iterable of text chunks; backend picks the
+    extractor (see html_extract, default: stream).
+    """
+    for line in iter_rows(html, backend):
+        # Keep lines that look like course data
+        if (CRN_LINE.search(line)
+                or 'Meeting Date:' in line
+                or 'Also Register in:' in line
+                or 'Section Information:' in line):
+            yield line
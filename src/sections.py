@@ -0,0 +1,244 @@
+import re
+import sys
+from array import array
+from datetime import date
+from typing import NamedTuple, Optional
+
+# ────────────────────────────────────────────────────────────────
+# Compact section model
+#
+# A Section is an immutable named tuple: times are integer minutes since
+# midnight, days a bitmask over WEEK_DAYS, dates the first and last day it
+# meets, and prof/building are ids into a process-wide table of interned
+# names.  SectionTable lays a whole catalog out as parallel arrays for code
+# that works on columns.
+# ────────────────────────────────────────────────────────────────
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+WEEK_DAYS = DAYS + ["Sat", "Sun"]
+WEEK_DAY_TO_INDEX = {day: i for i, day in enumerate(WEEK_DAYS)}
+ONLINE_BUILDING = "ON"
+
+# Weekly footprints are bitsets: one bit per minute, one day after another
+TICK_MINUTES = 1
+TICKS_PER_DAY = 24 * 60 // TICK_MINUTES
+
+_CLOCK = re.compile(r'(\d{1,2}):(\d{1,2})')
+_DATE  = re.compile(r'([A-Z][a-z]{2}) (\d{1,2}), (\d{4})')
+MONTHS = {m: i for i, m in enumerate(["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul",
+                                      "Aug", "Sep", "Oct", "Nov", "Dec"], start=1)}
+
+_names = []
+_name_ids = {}
+
+
+def name_id(name):
+    """Id of an interned prof/building name."""
+    if name not in _name_ids:
+        _name_ids[name] = len(_names)
+        _names.append(sys.intern(name))
+    return _name_ids[name]
+
+
+def name_of(i):
+    return _names[i]
+
+
+# Helper: "10:05" → 605, or None if it is not a valid HH:MM clock time
+def parse_clock(text):
+    match = _CLOCK.fullmatch(text.strip())
+    if not match:
+        return None
+    hours, mins = int(match.group(1)), int(match.group(2))
+    if hours > 23 or mins > 59:
+        return None
+    return hours * 60 + mins
+
+
+# Helper: Convert "10:05 - 11:25" to (605, 685)
+def parse_time_range(time_str):
+    if " - " not in time_str:
+        # Handle missing or malformed time strings
+        return None, None
+
+    start_str, end_str = time_str.split(" - ", 1)
+    start, end = parse_clock(start_str), parse_clock(end_str)
+    if start is None or end is None:
+        return None, None
+    return start, end
+
+
+# Helper: "Jan 07, 2026 to Apr 08, 2026" → (date(2026, 1, 7), date(2026, 4, 8)),
+# or None if it is not a valid range
+def parse_date_range(text):
+    ends = _DATE.findall(text)
+    if len(ends) != 2:
+        return None
+    try:
+        first, last = (date(int(year), MONTHS[month], int(day))
+                       for month, day, year in ends)
+    except (KeyError, ValueError):
+        return None
+    return (first, last) if first <= last else None
+
+
+# Helper: Convert "Mon Wed" → bitmask over WEEK_DAYS
+def parse_days(days_str):
+    mask = 0
+    for day in days_str.split():
+        if day in WEEK_DAY_TO_INDEX:
+            mask |= 1 << WEEK_DAY_TO_INDEX[day]
+    return mask
+
+
+# Helper: day bitmask → ["Mon", "Wed"]
+def day_names(days):
+    return [day for i, day in enumerate(WEEK_DAYS) if days >> i & 1]
+
+
+# Helper: 605 → "10:05"
+def format_minutes(m):
+    return "None" if m is None else f"{m // 60:02d}:{m % 60:02d}"
+
+
+# Helper: Weekly footprint as a bitset, bits start .. end-1 of each meeting day.
+# Two sections overlap exactly when their masks share a bit, i.e. when on some
+# day one starts before the other ends; back-to-back sections do not clash.
+def time_mask(days, start, end):
+    if start is None or end is None:
+        return 0
+
+    first = start // TICK_MINUTES
+    last = -(-end // TICK_MINUTES)   # round up
+    if last <= first:
+        return 0
+
+    run = ((1 << (last - first)) - 1) << first
+    mask = 0
+    for d in range(len(WEEK_DAYS)):
+        if days >> d & 1:
+            mask |= run << (d * TICKS_PER_DAY)
+    return mask
+
+
+class Section(NamedTuple):
+    has_number:   bool              # tutorial/lab (section letter + digits or T)
+    course:       str               # "COMP 2406"
+    section:      str               # "A", "A1", ...
+    prof_id:      int
+    days:         int               # bitmask over WEEK_DAYS
+    start:        Optional[int]     # minutes since midnight, None if unscheduled
+    end:          Optional[int]
+    mask:         int               # weekly footprint, see time_mask
+    building_id:  int
+    is_online:    bool
+    alternatives: tuple = ()        # interchangeable sections, see optimal_schedule
+    dates:        Optional[tuple] = None    # (first, last) meeting day, if listed
+
+    @property
+    def prof(self):
+        return _names[self.prof_id]
+
+    @property
+    def building(self):
+        return _names[self.building_id]
+
+    @property
+    def day_names(self):
+        return day_names(self.days)
+
+    @property
+    def is_async(self):
+        return self.is_online and self.start is None
+
+    @property
+    def is_online_scheduled(self):
+        return self.is_online and self.start is not None
+
+    def __reduce__(self):
+        # prof/building ids only mean something in this process (and a spawned
+        # worker starts with an empty table), so pickles carry the names
+        return (_unpickle_section, (self.prof, self.building) + tuple(self))
+
+
+# Helper: a pickled Section, names re-interned in this process's table
+def _unpickle_section(prof, building, *fields):
+    return Section._make(fields)._replace(prof_id=name_id(prof), building_id=name_id(building))
+
+
+# Build a Section from a parsed row
+# [has_number, course_code, section, prof, days, time, building, dates]
+# (rows without dates, from before they were parsed, still work).
+# Returns None (after saying why, if warn) for an offline section with a garbled time.
+def section_from_record(item, warn=True):
+    (has_number, course_code, section,
+     prof, days_str, time_str, building, *dates_str) = item
+
+    if prof in ("No No", "Yes Yes", "term course"):
+        prof = "N/A"
+
+    #  first find out whether this is an ON-LINE offering
+    is_online = (building == ONLINE_BUILDING)
+
+    # normalise the raw strings
+    days_trim  = days_str.strip()
+    time_trim  = time_str.strip()
+
+    # (a) no day / time given  → asynchronous ON-LINE or “Unknown”
+    if days_trim in ("", "Unknown"):
+        days = 0                 # keep it empty so it never plots
+    else:
+        days = parse_days(days_trim)
+
+    if time_trim in ("", "Unknown"):
+        start, end = None, None  # unscheduled (async) slot
+    else:
+        start, end = parse_time_range(time_trim)
+        if start is None or end is None:
+            # bad clock format → skip *unless* it’s ON-LINE async
+            if not is_online:                      # offline garbage
+                if warn:
+                    print(f"Skipping invalid time: {time_trim}"
+                          f" (Course: {course_code} {section})")
+                return None
+            start, end = None, None
+
+    dates = parse_date_range(dates_str[0]) if dates_str else None
+    return make_section(has_number, course_code, section, prof, days, start, end, building,
+                        dates)
+
+
+# Build a Section from plain columns (names, day bitmask, minutes, dates)
+def make_section(has_number, course_code, section, prof, days, start, end, building,
+                 dates=None):
+    return Section(bool(has_number), sys.intern(course_code), section,
+                   name_id(prof), days, start, end, time_mask(days, start, end),
+                   name_id(building), building == ONLINE_BUILDING, (), dates)
+
+
+class SectionTable:
+    """
+    Struct-of-arrays view of many sections, e.g. a whole term's catalog.
+
+    Row i describes sections[i]; unscheduled sections have start/end -1.
+    The arrays support the buffer protocol, so numpy.asarray() wraps them
+    without copying.
+    """
+
+    __slots__ = ('sections', 'start', 'end', 'days', 'prof_id', 'building_id',
+                 'timed', 'campus')
+
+    def __init__(self, sections):
+        self.sections    = list(sections)
+        timed            = [s.start is not None and s.end is not None for s in self.sections]
+        self.start       = array('i', (s.start if t else -1 for s, t in zip(self.sections, timed)))
+        self.end         = array('i', (s.end if t else -1 for s, t in zip(self.sections, timed)))
+        self.days        = array('B', (s.days for s in self.sections))
+        self.prof_id     = array('i', (s.prof_id for s in self.sections))
+        self.building_id = array('i', (s.building_id for s in self.sections))
+        self.timed       = array('b', timed)
+        # on campus: a timed section that is not an online meeting
+        self.campus      = array('b', (t and not s.is_online for s, t in zip(self.sections, timed)))
+
+    def __len__(self):
+        return len(self.sections)
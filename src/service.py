@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# ─────────────────────────────────────────────────────────────────────────────
+# service.py  –  long-running HTTP/JSON scheduling service for one term
+#
+#   python src/service.py --term 202610 --port 8000 --workers 4
+#   curl -d '{"courses": ["COMP 2406", "COMP 2804"], "top_n": 3}' localhost:8000/schedule
+#
+# The term's sections are read from the database once, at startup (fetch them
+# first, e.g. with main.py --bulk).  Each course's options are built once per
+# set of excluded profs that actually teach it, and the ScheduleSpaces of
+# recent course lists are kept, so a request mostly costs its search.
+# Searches run on a pool of worker processes, each holding its own copy of
+# the catalog; the HTTP side only parses and validates.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import argparse
+import functools
+import json
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+
+from database import init_db, term_sections
+from main import TERM, course_code
+from optimal_schedule import (ScheduleSpace, collapse_options, group_by_course,
+                              options_for_course, schedule_to_dict, search_space)
+
+HOST = "127.0.0.1"
+PORT = 8000
+TIME_BUDGET_MS = 2000   # per search; a request may ask for less
+MAX_TOP_N = 20
+MAX_COURSES = 10
+SPACE_CACHE = 256       # ScheduleSpaces kept, most recently used first
+MAX_BODY = 64 * 1024
+
+
+class RequestError(ValueError):
+    """A malformed /schedule request; answered with 400 and this message."""
+
+
+class TermCatalog:
+    """
+    One term's sections grouped by course, with the schedulable options
+    built on demand and cached.  Read-only once built, apart from its caches,
+    so one catalog can serve many threads.
+    """
+
+    def __init__(self, sections):
+        self.sections = dict(group_by_course(sections))
+        self.profs    = {course: {s.prof for s in group}
+                         for course, group in self.sections.items()}
+        self.spaces   = functools.lru_cache(maxsize=SPACE_CACHE)(self._build_space)
+        self._options = {}
+
+    def options(self, course, exclude):
+        """The collapsed options of a course with the profs in exclude avoided."""
+        key = (course, exclude & self.profs[course])   # only its own profs matter
+        options = self._options.get(key)
+        if options is None:
+            options = collapse_options(options_for_course(self.sections[course], key[1]),
+                                       key[1])
+            self._options[key] = options
+        return options
+
+    def _build_space(self, courses, exclude):
+        all_course_options = [options for options in
+                              (self.options(course, exclude) for course in courses)
+                              if options]
+        return ScheduleSpace(all_course_options), all_course_options
+
+    def schedule(self, courses, exclude, top_n, time_budget_ms):
+        """
+        The /schedule response for known course codes (sorted, so ties do
+        not depend on the order they were asked for in) and a frozenset of
+        profs to avoid.
+        """
+        deadline = perf_counter() + time_budget_ms / 1000
+        space, all_course_options = self.spaces(tuple(sorted(courses)), exclude)
+        stats = {}
+        scored = search_space(space, all_course_options, top_n, stats, deadline)
+        return {
+            "schedules":  [schedule_to_dict(score, sched) for score, sched in scored],
+            "exhaustive": stats.get('exhaustive', True),
+            "stats":      stats,
+        }
+
+
+# Helper: a /schedule request body as (courses, exclude, top_n, time_budget_ms),
+# or RequestError
+def parse_request(body, time_budget_ms=TIME_BUDGET_MS):
+    try:
+        request = json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise RequestError(f"body is not JSON: {e}") from None
+    if not isinstance(request, dict):
+        raise RequestError("body must be a JSON object")
+
+    courses = request.get("courses")
+    if not isinstance(courses, list) or not courses \
+            or not all(isinstance(code, str) for code in courses):
+        raise RequestError('"courses" must be a non-empty list of course codes')
+    if len(courses) > MAX_COURSES:
+        raise RequestError(f"at most {MAX_COURSES} courses per request")
+    try:
+        courses = list(dict.fromkeys(course_code(code) for code in courses))
+    except argparse.ArgumentTypeError as e:
+        raise RequestError(str(e)) from None
+
+    exclude = request.get("exclude_profs", [])
+    if not isinstance(exclude, list) or not all(isinstance(p, str) for p in exclude):
+        raise RequestError('"exclude_profs" must be a list of names')
+
+    top_n = request.get("top_n", 3)
+    if not isinstance(top_n, int) or isinstance(top_n, bool) or not 1 <= top_n <= MAX_TOP_N:
+        raise RequestError(f'"top_n" must be an integer from 1 to {MAX_TOP_N}')
+
+    budget = request.get("time_budget_ms", time_budget_ms)
+    if not isinstance(budget, (int, float)) or isinstance(budget, bool) or budget <= 0:
+        raise RequestError('"time_budget_ms" must be a positive number')
+
+    return courses, frozenset(exclude), top_n, min(budget, time_budget_ms)
+
+
+class Service:
+    """
+    The term's catalog and the processes searching it.  workers=1 searches
+    in the request's own thread (the GIL then lets one search run at a time);
+    None means one worker per CPU core.
+    """
+
+    def __init__(self, term, workers=None, time_budget_ms=TIME_BUDGET_MS):
+        self.term = term
+        self.time_budget_ms = time_budget_ms
+        sections = term_sections(term)
+        self.catalog = TermCatalog(sections)
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+        if self.workers > 1:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                            initializer=_init_worker, initargs=(sections,))
+            # start every worker now, before any request thread exists
+            list(self.pool.map(_ready, range(self.workers)))
+
+    def health(self):
+        return {"term": self.term, "courses": len(self.catalog.sections),
+                "workers": self.workers}
+
+    def schedule(self, body):
+        courses, exclude, top_n, budget = parse_request(body, self.time_budget_ms)
+        missing = [code for code in courses if code not in self.catalog.sections]
+        known   = [code for code in courses if code in self.catalog.sections]
+
+        job = (known, exclude, top_n, budget)
+        if self.pool is None:
+            response = _schedule(job, self.catalog)
+        else:
+            response = self.pool.submit(_schedule, job).result()
+        response["missing"] = missing
+        return response
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+# Pool worker state: this process's TermCatalog
+_worker_catalog = None
+
+def _init_worker(sections):
+    global _worker_catalog
+    signal.signal(signal.SIGINT, signal.SIG_IGN)    # Ctrl-C is the server's to handle
+    _worker_catalog = TermCatalog(sections)
+
+def _ready(_):
+    return _worker_catalog is not None
+
+def _schedule(job, catalog=None):
+    courses, exclude, top_n, budget = job
+    return (catalog or _worker_catalog).schedule(courses, exclude, top_n, budget)
+
+
+class Handler(BaseHTTPRequestHandler):
+    """GET /health, POST /schedule; self.server.service is the Service."""
+
+    server_version = "CUScheduler/1.0"
+
+    def do_GET(self):
+        if self.path != "/health":
+            self.send_json(404, {"error": f"no such endpoint: {self.path}"})
+            return
+        self.send_json(200, self.server.service.health())
+
+    def do_POST(self):
+        if self.path != "/schedule":
+            self.send_json(404, {"error": f"no such endpoint: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if not 0 < length <= MAX_BODY:
+            self.send_json(400 if length <= 0 else 413,
+                           {"error": f"expected a JSON body of at most {MAX_BODY} bytes"})
+            return
+        try:
+            response = self.server.service.schedule(self.rfile.read(length))
+        except RequestError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        self.send_json(200, response)
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class Server(ThreadingHTTPServer):
+    """One thread per connection; room for a registration-week burst of them."""
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, service):
+        super().__init__(address, Handler)
+        self.service = service
+
+
+def serve(service, host=HOST, port=PORT):
+    """Answer requests with service until interrupted."""
+    server = Server((host, port), service)
+    print(f"Serving term {service.term} ({len(service.catalog.sections)} courses, "
+          f"{service.workers} search worker(s)) on http://{host}:{server.server_port}",
+          flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve schedules for one term over HTTP/JSON")
+    parser.add_argument("--term", default=TERM, help=f"term code (default {TERM})")
+    parser.add_argument("--host", default=HOST, help=f"address to listen on (default {HOST})")
+    parser.add_argument("--port", type=int, default=PORT, help=f"port (default {PORT})")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="search processes (default 0 = one per CPU core, "
+                             "1 = search in the request threads)")
+    parser.add_argument("--time-budget-ms", type=int, default=TIME_BUDGET_MS,
+                        help=f"longest search per request (default {TIME_BUDGET_MS})")
+    args = parser.parse_args()
+
+    init_db()
+    service = Service(args.term, args.workers or None, args.time_budget_ms)
+    if not service.catalog.sections:
+        print(f"Warning: no sections stored for term {args.term}; "
+              f"fetch them first, e.g. python src/main.py --bulk --term {args.term} ...")
+    serve(service, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,64 +1,210 @@
 #!/usr/bin/env python
 # ─────────────────────────────────────────────────────────────────────────────
-# test_performance.py  –  benchmark parse_input + optimize_schedule
+# test.py  –  performance suite: per-stage timings over a scaling grid
+#
+#   python src/test.py --save before.json
+#   ... change something ...
+#   python src/test.py --compare before.json        # exit status 1 on regressions
+#   python src/test.py --compare before.json after.json
 # ─────────────────────────────────────────────────────────────────────────────
 
 import argparse
-import statistics as st
+import itertools
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
 import time
+from datetime import datetime
 
-import matplotlib.pyplot as plt
-plt.show = lambda *a, **k: None          # suppress all plot windows
+from bench            import synthetic_dump
+from optimal_schedule import (best_schedules, build_course_options, build_slots,
+                              generate_valid_schedules, group_by_course, score_schedule)
+from parsing          import parse_lines
+from writers          import schedule_svg
 
-from parsing          import parse_input
-from optimal_schedule import optimize_schedule
+STAGES = ("parse_lines", "build_slots", "generate_valid_schedules", "score_schedule",
+          "best_schedules", "render")
 
 
-COURSE_SET = {"COMP 2804", "COMP 2406", "COMP 3000", "COMP 2404", "GEOM 2005"}
-TERM_FILE  = "fall.txt"
-
-
-def timed_call(fn, *args, **kwargs):
-    t0 = time.perf_counter()
-    fn(*args, **kwargs)
-    return time.perf_counter() - t0
-
-
-def run_benchmark(reps: int):
-    results = []
-
+def timed(fn, reps):
+    """Best-of-reps wall time of fn(), and its (last) result."""
+    best = float("inf")
+    result = None
     for _ in range(reps):
-        # Parse once
-        t_parse = timed_call(parse_input, COURSE_SET, TERM_FILE)
-        courses = parse_input(COURSE_SET, TERM_FILE)   # reuse parsed data
-
-        # Optimize (plot suppressed by plt.show stub)
-        t_opt = timed_call(optimize_schedule, courses, show_location=False)
-
-        results.append((t_parse, t_opt, t_parse + t_opt))
-
-    return results
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def run_point(courses, lectures, tutorials, density, *, term_courses, seed, reps, top_n,
+              max_combos, render):
+    """
+    Time every stage for one grid point: a term of term_courses synthetic
+    courses, `courses` of them requested.  Enumeration and scoring of every
+    valid schedule are skipped (None) past max_combos combinations.
+    """
+    codes, lines = synthetic_dump(max(term_courses, courses), lectures, tutorials, seed,
+                                  conflict_density=density)
+    wanted = set(codes[:courses])
+    times, counts = {}, {"lines": len(lines)}
+
+    times["parse_lines"], records = timed(lambda: parse_lines(wanted, lines), reps)
+    times["build_slots"], slots = timed(lambda: build_slots(records), reps)
+    groups = group_by_course(slots)
+    counts["slots"] = len(slots)
+    counts["combos"] = math.prod(len(options) for options in build_course_options(groups))
+
+    if counts["combos"] <= max_combos:
+        times["generate_valid_schedules"], valid = timed(
+            lambda: generate_valid_schedules(groups), reps)
+        times["score_schedule"], _ = timed(lambda: [score_schedule(s) for s in valid], reps)
+        counts["valid"] = len(valid)
+    else:
+        times["generate_valid_schedules"] = times["score_schedule"] = None
+        counts["valid"] = None
+
+    times["best_schedules"], best = timed(lambda: best_schedules(groups, top_n), reps)
+    counts["best"] = len(best)
+
+    if not best:
+        times["render"] = None
+    elif render == "svg":
+        times["render"], _ = timed(lambda: [schedule_svg(s) for _, s in best], reps)
+    elif render == "png":
+        from plotting import render_schedules   # matplotlib only when asked for
+        with tempfile.TemporaryDirectory() as run_dir:
+            times["render"], _ = timed(lambda: render_schedules(best, run_dir, dpi=100,
+                                                                workers=1), 1)
+    else:
+        times["render"] = None
+    return times, counts
+
+
+def run_suite(args):
+    results = []
+    grid = itertools.product(args.courses, args.lectures, args.tutorials, args.density)
+    for courses, lectures, tutorials, density in grid:
+        params = dict(courses=courses, lectures=lectures, tutorials=tutorials, density=density)
+        with open(os.devnull, "w") as devnull:
+            stdout, sys.stdout = sys.stdout, devnull    # render_schedules reports each file
+            try:
+                times, counts = run_point(courses, lectures, tutorials, density,
+                                          term_courses=args.term_courses, seed=args.seed,
+                                          reps=args.reps, top_n=args.top_n,
+                                          max_combos=args.max_combos, render=args.render)
+            finally:
+                sys.stdout = stdout
+        results.append({"params": params, "times": times, "counts": counts})
+        print(f"{point_label(params):<34} valid {counts['valid']}  " +
+              "  ".join(f"{stage} {format_seconds(times[stage])}" for stage in STAGES),
+              flush=True)
+    return {"meta": meta(args), "results": results}
+
+
+def meta(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "machine": platform.machine(),
+            "term_courses": args.term_courses, "seed": args.seed, "reps": args.reps,
+            "top_n": args.top_n, "render": args.render}
+
+
+def point_label(params):
+    return (f"courses={params['courses']} lec={params['lectures']} "
+            f"tut={params['tutorials']} density={params['density']:g}")
+
+
+def format_seconds(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.2f}ms"
+
+
+def compare(old, new, threshold, min_seconds):
+    """
+    Print stage times of new against old, grid point by grid point, and
+    return the (point, stage) pairs more than `threshold` (a fraction) and
+    min_seconds slower in new.
+    """
+    old_points = {point_label(r["params"]): r["times"] for r in old["results"]}
+    print(f"old: {old['meta'].get('commit')} ({old['meta'].get('date')})  "
+          f"new: {new['meta'].get('commit')} ({new['meta'].get('date')})")
+    regressions = []
+    for result in new["results"]:
+        label = point_label(result["params"])
+        before = old_points.get(label)
+        if before is None:
+            continue
+        for stage in STAGES:
+            t_old, t_new = before.get(stage), result["times"].get(stage)
+            if t_old is None or t_new is None:
+                continue
+            ratio = t_new / t_old if t_old else float("inf")
+            flag = ""
+            if ratio > 1 + threshold and t_new - t_old > min_seconds:
+                flag = "  REGRESSION"
+                regressions.append((label, stage))
+            elif ratio < 1 - threshold and t_old - t_new > min_seconds:
+                flag = "  faster"
+            print(f"{label:<34} {stage:<25} {format_seconds(t_old):>10} → "
+                  f"{format_seconds(t_new):>10}  ×{ratio:.2f}{flag}")
+    print(f"{len(regressions)} regression(s) beyond {threshold:.0%}")
+    return regressions
 
 
 def main():
-    parser = argparse.ArgumentParser("Performance test for scheduler")
-    parser.add_argument("--reps", type=int, default=100)
+    parser = argparse.ArgumentParser("Performance suite for the scheduler")
+    parser.add_argument("--courses", type=int, nargs="+", default=[3, 5, 7],
+                        help="requested courses per grid point")
+    parser.add_argument("--lectures", type=int, nargs="+", default=[2, 3],
+                        help="lectures per course")
+    parser.add_argument("--tutorials", type=int, nargs="+", default=[2, 4],
+                        help="tutorials per lecture")
+    parser.add_argument("--density", type=float, nargs="+", default=[0.0, 0.5],
+                        help="conflict density, 0 to 1 (see bench.synthetic_dump)")
+    parser.add_argument("--term-courses", type=int, default=300,
+                        help="courses in the synthetic term that gets parsed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reps", type=int, default=3)
+    parser.add_argument("--top-n", type=int, default=3)
+    parser.add_argument("--max-combos", type=int, default=200_000,
+                        help="skip enumerating every valid schedule past this many combinations")
+    parser.add_argument("--render", choices=("svg", "png", "none"), default="svg")
+    parser.add_argument("--save", metavar="FILE", help="write the results here as JSON")
+    parser.add_argument("--compare", nargs="+", metavar="FILE",
+                        help="OLD [NEW]: compare saved results (NEW defaults to a fresh run)")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="slowdown that counts as a regression (default 0.10 = 10%%)")
+    parser.add_argument("--min-ms", type=float, default=1.0,
+                        help="ignore differences smaller than this many ms")
     args = parser.parse_args()
 
-    runs = run_benchmark(args.reps)
-    p_times, o_times, tot_times = zip(*runs)
-
-    def line(label, data):
-        print(f"{label:14s}  "
-              f"min {min(data):7.4f}s  "
-              f"avg {st.mean(data):7.4f}s  "
-              f"max {max(data):7.4f}s")
-
-    print("\n=== Scheduler Performance ===")
-    line("parse_input", p_times)
-    line("optimize",    o_times)
-    line("total",       tot_times)
-    print(f"reps: {args.reps}, courses: {len(COURSE_SET)}, term: {TERM_FILE}\n")
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes OLD and optionally NEW")
+
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[1], encoding="utf-8") as f:
+            new = json.load(f)
+    else:
+        new = run_suite(args)
+        if args.save:
+            with open(args.save, "w", encoding="utf-8") as f:
+                json.dump(new, f, indent=2)
+            print(f"Saved {args.save}")
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f:
+            old = json.load(f)
+        if compare(old, new, args.threshold, args.min_ms / 1000):
+            sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,312 @@
+import calendar
+import os
+from datetime import date, datetime, timedelta, timezone
+from html import escape
+
+from database import TERM_LAST_MONTH
+from layout import FIRST_HOUR, LAST_HOUR, TITLE, async_footer, schedule_blocks, theme
+from sections import DAYS, WEEK_DAY_TO_INDEX, format_minutes
+
+# ────────────────────────────────────────────────────────────────
+# SVG, HTML and iCalendar output
+#
+# Plain string building on top of layout, so none of these import
+# matplotlib: the SVG and HTML writers draw the same weekly grid as
+# plotting (same colours, labels and async-course footer), the iCalendar
+# writer turns each section into a weekly recurring event.
+# ────────────────────────────────────────────────────────────────
+
+WRITER_FORMATS = ("svg", "html", "ics")
+
+# SVG geometry, in pixels
+SVG_WIDTH, SVG_HEIGHT = 1200, 900
+SVG_LEFT, SVG_RIGHT, SVG_TOP, SVG_BOTTOM = 70, 20, 50, 90
+SVG_FONT_SIZE = 12
+SVG_LINE_HEIGHT = 1.2 * SVG_FONT_SIZE
+
+# HTML grid: one table row per this many minutes
+HTML_ROW_MINUTES = 5
+
+# matplotlib line styles as SVG dash arrays
+DASHES = {"--": "6 4", ":": "1 3", "-.": "6 3 1 3", "-": None}
+
+
+# ─── SVG ─────────────────────────────────────────────────────────
+
+def schedule_svg(schedule, *, show_location=True, dark_mode=False):
+    """The weekly grid of a schedule as a standalone SVG document."""
+    t = theme(dark_mode)
+    left, top = SVG_LEFT, SVG_TOP
+    width  = SVG_WIDTH - SVG_LEFT - SVG_RIGHT
+    height = SVG_HEIGHT - SVG_TOP - SVG_BOTTOM
+    col    = width / len(DAYS)
+    hour   = height / (LAST_HOUR - FIRST_HOUR)
+
+    def x(day):
+        return left + day * col
+
+    def y(hours):
+        return top + (hours - FIRST_HOUR) * hour
+
+    grid = t.grid
+    dash = DASHES.get(grid.get("linestyle", "-"))
+    grid_attrs = (f'stroke="{grid["color"]}" stroke-width="{grid["linewidth"]}" '
+                  f'stroke-opacity="{grid["alpha"]}"'
+                  + (f' stroke-dasharray="{dash}"' if dash else ""))
+
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{SVG_WIDTH}" height="{SVG_HEIGHT}" '
+           f'viewBox="0 0 {SVG_WIDTH} {SVG_HEIGHT}" font-family="DejaVu Sans, Arial, sans-serif">',
+           f'<rect width="100%" height="100%" fill="{t.background}"/>',
+           f'<clipPath id="grid"><rect x="{left}" y="{top}" width="{width}" height="{height}"/></clipPath>',
+           f'<text x="{left + width / 2:.1f}" y="{top - 15}" text-anchor="middle" font-size="16" '
+           f'fill="{t.text}">{escape(TITLE)}</text>']
+
+    # grid & axes -----------------------------------------------------
+    for h in range(FIRST_HOUR, LAST_HOUR + 1):
+        out.append(f'<line x1="{left}" y1="{y(h):.1f}" x2="{left + width}" y2="{y(h):.1f}" {grid_attrs}/>')
+        out.append(f'<text x="{left - 8}" y="{y(h) + 4:.1f}" text-anchor="end" font-size="{SVG_FONT_SIZE}" '
+                   f'fill="{t.text}">{h:02d}:00</text>')
+    for d, day in enumerate(DAYS):
+        out.append(f'<line x1="{x(d):.1f}" y1="{top}" x2="{x(d):.1f}" y2="{top + height}" {grid_attrs}/>')
+        out.append(f'<text x="{x(d):.1f}" y="{top + height + 18}" text-anchor="middle" '
+                   f'font-size="{SVG_FONT_SIZE}" fill="{t.text}">{day}</text>')
+    out.append(f'<rect x="{left}" y="{top}" width="{width}" height="{height}" fill="none" '
+               f'stroke="{t.text}"/>')
+
+    # slots -----------------------------------------------------------
+    out.append('<g clip-path="url(#grid)">')
+    for block in schedule_blocks(schedule, show_location):
+        fill = getattr(t, block.kind)
+        bx, by = x(block.day), y(block.start)
+        out.append(f'<rect x="{bx:.1f}" y="{by:.1f}" width="{0.95 * col:.1f}" '
+                   f'height="{block.duration * hour:.1f}" fill="{fill}" stroke="{fill}" '
+                   f'stroke-width="1.2"/>')
+        # lines centred on the block, like va="center"
+        first = (by + block.duration * hour / 2
+                 - (len(block.lines) - 1) * SVG_LINE_HEIGHT / 2 + 0.35 * SVG_FONT_SIZE)
+        out.append(f'<text x="{bx + 0.02 * col:.1f}" y="{first:.1f}" font-size="{SVG_FONT_SIZE}" '
+                   f'fill="{t.text}">')
+        for i, line in enumerate(block.lines):
+            dy = 0 if i == 0 else SVG_LINE_HEIGHT
+            out.append(f'<tspan x="{bx + 0.02 * col:.1f}" dy="{dy:.1f}">{escape(line)}</tspan>')
+        out.append('</text>')
+    out.append('</g>')
+
+    footer = async_footer(schedule)
+    if footer:
+        out.append(f'<text x="{0.01 * SVG_WIDTH:.0f}" y="{0.98 * SVG_HEIGHT:.0f}" font-size="15" '
+                   f'fill="{t.text}">{escape(footer)}</text>')
+    out.append('</svg>')
+    return "\n".join(out) + "\n"
+
+
+# ─── HTML ────────────────────────────────────────────────────────
+
+HTML_STYLE = """
+body {{ background: {background}; color: {text}; font-family: "DejaVu Sans", Arial, sans-serif; }}
+table.week {{ border-collapse: collapse; table-layout: fixed; width: 100%; max-width: 1100px; }}
+table.week caption {{ font-size: 1.2em; padding: 0.5em; }}
+table.week th {{ font-weight: normal; font-size: 0.8em; vertical-align: top; }}
+table.week thead th {{ width: 18%; }}
+table.week thead th:first-child {{ width: 4em; }}
+table.week td {{ height: 4px; padding: 0 0.3em; font-size: 0.75em; line-height: 1.2; }}
+table.week tr.hour > * {{ border-top: {grid_width}px {grid_style} {grid_colour}; }}
+table.week td.normal {{ background: {normal}; }}
+table.week td.forced {{ background: {forced}; }}
+table.week td.online {{ background: {online}; }}
+p.footer {{ font-size: 0.9em; }}
+"""
+
+
+# Helper: a Block's first and last+1 row of the HTML grid, clipped to it.
+# Both ends go to the nearest row boundary, so back-to-back sections off the
+# HTML_ROW_MINUTES grid (10:00-10:52, 10:53-11:40) never share a row.
+def _block_ticks(block):
+    first = FIRST_HOUR * 60
+    start = round(block.start * 60) - first
+    end   = round((block.start + block.duration) * 60) - first
+    ticks = (LAST_HOUR - FIRST_HOUR) * 60 // HTML_ROW_MINUTES
+    half  = HTML_ROW_MINUTES // 2
+    return (max(0, (start + half) // HTML_ROW_MINUTES),
+            min(ticks, (end + half) // HTML_ROW_MINUTES))
+
+
+# Helper: CSS colour with opacity, for the grid lines
+def _css_colour(colour, alpha):
+    if colour.startswith("#") and len(colour) == 7:
+        r, g, b = (int(colour[i:i + 2], 16) for i in (1, 3, 5))
+        return f"rgba({r}, {g}, {b}, {alpha})"
+    if colour in ("black", "white"):
+        value = 0 if colour == "black" else 255
+        return f"rgba({value}, {value}, {value}, {alpha})"
+    return colour
+
+
+def schedule_html(schedule, *, show_location=True, dark_mode=False):
+    """The weekly grid of a schedule as a self-contained HTML page with one table."""
+    t = theme(dark_mode)
+    ticks_per_hour = 60 // HTML_ROW_MINUTES
+    n_ticks = (LAST_HOUR - FIRST_HOUR) * ticks_per_hour
+
+    # per day: tick → (block, rowspan) where a block starts; ticks it covers
+    starts  = [{} for _ in DAYS]
+    covered = [set() for _ in DAYS]
+    for block in schedule_blocks(schedule, show_location):
+        start, end = _block_ticks(block)
+        if end <= start or start in covered[block.day]:
+            continue
+        starts[block.day][start] = (block, end - start)
+        covered[block.day].update(range(start, end))
+
+    style = HTML_STYLE.format(background=t.background, text=t.text,
+                              normal=t.normal, forced=t.forced, online=t.online,
+                              grid_width=t.grid["linewidth"],
+                              grid_style="dashed" if t.grid["linestyle"] != "-" else "solid",
+                              grid_colour=_css_colour(t.grid["color"], t.grid["alpha"]))
+    out = ['<!DOCTYPE html>', '<html><head><meta charset="utf-8">',
+           f'<title>{escape(TITLE)}</title>', f'<style>{style}</style>', '</head><body>',
+           f'<table class="week"><caption>{escape(TITLE)}</caption>',
+           '<thead><tr><th></th>' + "".join(f'<th>{day}</th>' for day in DAYS) + '</tr></thead>',
+           '<tbody>']
+    for tick in range(n_ticks):
+        cells = []
+        if tick % ticks_per_hour == 0:
+            cells.append(f'<th rowspan="{ticks_per_hour}">'
+                         f'{FIRST_HOUR + tick // ticks_per_hour:02d}:00</th>')
+        for d in range(len(DAYS)):
+            if tick in starts[d]:
+                block, span = starts[d][tick]
+                text = "<br>".join(escape(line) for line in block.lines)
+                cells.append(f'<td rowspan="{span}" class="{block.kind}">{text}</td>')
+            elif tick not in covered[d]:
+                cells.append('<td></td>')
+        row_class = ' class="hour"' if tick % ticks_per_hour == 0 else ''
+        out.append(f'<tr{row_class}>' + "".join(cells) + '</tr>')
+    out.append('</tbody></table>')
+
+    footer = async_footer(schedule)
+    if footer:
+        out.append(f'<p class="footer">{escape(footer)}</p>')
+    out.append('</body></html>')
+    return "\n".join(out) + "\n"
+
+
+# ─── iCalendar ───────────────────────────────────────────────────
+
+ICS_DAYS = {"Mon": "MO", "Tue": "TU", "Wed": "WE", "Thu": "TH", "Fri": "FR",
+            "Sat": "SA", "Sun": "SU"}
+
+
+def term_dates(term):
+    """
+    (first day, last day) of a term code such as "202610", approximated as
+    whole months: January–April, May–August or September–December.  Only
+    for sections whose listing gave no meeting dates.
+    """
+    year, season = int(term[:4]), term[4:]
+    if season not in TERM_LAST_MONTH:
+        raise ValueError(f"unknown term season in {term!r}; expected one of {sorted(TERM_LAST_MONTH)}")
+    last_month = TERM_LAST_MONTH[season]
+    return (date(year, last_month - 3, 1),
+            date(year, last_month, calendar.monthrange(year, last_month)[1]))
+
+
+# Helper: iCalendar TEXT escaping
+def _ics_text(text):
+    return (text.replace("\\", "\\\\").replace(";", "\\;")
+                .replace(",", "\\,").replace("\n", "\\n"))
+
+
+# Helper: fold a content line into 75-octet pieces (RFC 5545 3.1)
+def _ics_fold(line):
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line
+    pieces, limit = [], 75
+    while data:
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:   # not inside a character
+            cut -= 1
+        pieces.append(data[:cut].decode("utf-8"))
+        data, limit = data[cut:], 74                            # the leading space counts
+    return "\r\n ".join(pieces)
+
+
+def schedule_ics(schedule, term_start, term_end, *, name=TITLE, stamp=None):
+    """
+    A schedule as an iCalendar file: one weekly event per scheduled section
+    from its first meeting until its last, in floating local time.  The
+    meeting dates are the section's own, or term_start to term_end when its
+    listing gave none.  Online asynchronous sections have no meeting times
+    and so no events.
+    """
+    stamp = (stamp or datetime.now(timezone.utc)).strftime("%Y%m%dT%H%M%SZ")
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//CU Course Scheduler//EN",
+             "CALSCALE:GREGORIAN", f"X-WR-CALNAME:{_ics_text(name)}"]
+
+    for slot in schedule:
+        if slot.start is None or slot.end is None or not slot.days:
+            continue
+        weekdays = [WEEK_DAY_TO_INDEX[day] for day in slot.day_names]
+        first_day, last_day = slot.dates or (term_start, term_end)
+        first = next(first_day + timedelta(days=i) for i in range(7)
+                     if (first_day + timedelta(days=i)).weekday() in weekdays)
+        if first > last_day:
+            continue                    # its dates hold none of its days
+        location = "Online" if slot.is_online else slot.building
+        # the event is the section chosen; interchangeable ones go in the description
+        summary = f"{slot.course} {slot.section}"
+        description = slot.prof
+        others = [section for section in slot.alternatives if section != slot.section]
+        if others:
+            description += f"\nAlternatives: {', '.join(others)}"
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{term_start:%Y%m%d}-{slot.course.replace(' ', '')}-{slot.section}"
+            f"@cu-course-scheduler",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART:{first:%Y%m%d}T{format_minutes(slot.start).replace(':', '')}00",
+            f"DTEND:{first:%Y%m%d}T{format_minutes(slot.end).replace(':', '')}00",
+            f"RRULE:FREQ=WEEKLY;BYDAY={','.join(ICS_DAYS[day] for day in slot.day_names)};"
+            f"UNTIL={last_day:%Y%m%d}T235959",
+            f"SUMMARY:{_ics_text(summary)}",
+            f"DESCRIPTION:{_ics_text(description)}",
+        ]
+        if location not in ("", "Unknown"):
+            lines.append(f"LOCATION:{_ics_text(location)}")
+        lines.append("END:VEVENT")
+
+    lines.append("END:VCALENDAR")
+    return "".join(_ics_fold(line) + "\r\n" for line in lines)
+
+
+# ─── files ───────────────────────────────────────────────────────
+
+def write_schedules(scored, run_dir, fmt, *, show_location=True, dark_mode=False, term=None):
+    """
+    Write (score, schedule) pairs to run_dir/schedule{rank}_{score}.{fmt},
+    fmt being one of WRITER_FORMATS; "ics" needs the term code, for sections
+    without meeting dates (see term_dates).  Returns the paths in rank order.
+    """
+    if fmt not in WRITER_FORMATS:
+        raise ValueError(f"unknown output format {fmt!r}; expected one of {WRITER_FORMATS}")
+    if fmt == "ics":
+        if term is None:
+            raise ValueError("iCalendar output needs the term")
+        term_start, term_end = term_dates(term)
+
+    os.makedirs(run_dir, exist_ok=True)
+    paths = []
+    for idx, (score, sched) in enumerate(scored, start=1):
+        if fmt == "svg":
+            text = schedule_svg(sched, show_location=show_location, dark_mode=dark_mode)
+        elif fmt == "html":
+            text = schedule_html(sched, show_location=show_location, dark_mode=dark_mode)
+        else:
+            text = schedule_ics(sched, term_start, term_end)
+        path = os.path.join(run_dir, f"schedule{idx}_{int(score)}.{fmt}")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        print(f"Saved {path}")
+        paths.append(path)
+    return paths
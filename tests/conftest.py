@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# the modules in src/ import each other by name, as when run as scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import database     # once src/ is on sys.path
+
+
+@pytest.fixture
+def tmp_db(tmp_path, monkeypatch):
+    """A fresh courses.db for the test; this thread's connection is closed after it."""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "courses.db"))
+    database.init_db()
+    yield database.DB_PATH
+    database.close_connection()
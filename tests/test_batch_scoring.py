@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import optimal_schedule as opt
+from batch_scoring import best_schedules_batched, build_slot_table, score_batch
+from sections import make_section
+
+TIMES = [(505, 585), (515, 595), (605, 685), (640, 720), (695, 775), (785, 865)]
+
+
+def random_section(rng, code, name, has_number):
+    if rng.random() < 0.15:
+        return make_section(has_number, code, name, "Ada Lovelace", 0, None, None, "ON")
+    start, end = rng.choice(TIMES)
+    return make_section(has_number, code, name, "Ada Lovelace", rng.randrange(1, 32),
+                        start, end, rng.choice(["HP", "SC", "ON"]))
+
+
+def random_groups(rng, courses):
+    sections = []
+    for i in range(courses):
+        code = f"COMP {1000 + i}"
+        for lecture in "ABC"[:rng.randint(1, 3)]:
+            sections.append(random_section(rng, code, lecture, False))
+            for t in range(1, rng.randint(0, 3) + 1):
+                sections.append(random_section(rng, code, f"{lecture}{t}", True))
+    return opt.group_by_course(sections)
+
+
+def test_score_batch_matches_score_schedule():
+    rng = random.Random(0)
+    slots = [random_section(rng, "COMP 1000", str(i), False) for i in range(60)]
+    table = build_slot_table(slots)
+    width = 8
+    candidates = np.full((500, width), -1, dtype=np.int64)
+    for row in candidates:
+        picked = rng.sample(range(len(slots)), rng.randint(0, width))
+        row[:len(picked)] = picked
+
+    expected = [opt.score_schedule([slots[i] for i in row if i >= 0]) for row in candidates]
+    assert score_batch(table, candidates).tolist() == expected
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 4096])
+def test_best_schedules_batched_matches_best_schedules(block_size):
+    rng = random.Random(block_size)
+    for _ in range(60):
+        groups = random_groups(rng, rng.randint(1, 5))
+        top_n = rng.randint(1, 5)
+        assert (best_schedules_batched(groups, top_n, block_size)
+                == opt.best_schedules(groups, top_n, collapse=False))
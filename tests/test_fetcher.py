@@ -0,0 +1,128 @@
+import itertools
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import fetcher
+
+
+class StubCentral(ThreadingHTTPServer):
+    """
+    A stand-in for Carleton Central's bwysched pages.  Sessions expire after
+    `expire_after` searches; with blocked, every search is answered with 403.
+    Records (time, path) of every request.
+    """
+    daemon_threads = True
+
+    def __init__(self, expire_after=None, blocked=False):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.expire_after = expire_after
+        self.blocked = blocked
+        self.ids = itertools.count(1)
+        self.uses = {}
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def times(self, page=""):
+        return [t for t, path in self.requests if page in path]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, status, body, cookie=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if cookie:
+            self.send_header("Set-Cookie", cookie)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        stub = self.server
+        with stub.lock:
+            stub.requests.append((time.monotonic(), self.path))
+            sess_id = f"S{next(stub.ids)}"
+            stub.uses[sess_id] = 0
+        self.send(200, f'<form><input name="session_id" value="{sess_id}"></form>',
+                  cookie=f"SESSID={sess_id}; Path=/")
+
+    def do_POST(self):
+        stub = self.server
+        length = int(self.headers["Content-Length"])
+        form = urllib.parse.parse_qs(self.rfile.read(length).decode("utf-8"))
+        with stub.lock:
+            stub.requests.append((time.monotonic(), self.path))
+        if "p_course_search" not in self.path:
+            self.send(200, "<html>Term set</html>")
+            return
+        if stub.blocked:
+            self.send(403, "<html>Forbidden</html>")
+            return
+
+        sess_id = form["session_id"][0]
+        with stub.lock:
+            valid = sess_id in stub.uses and f"SESSID={sess_id}" in self.headers.get("Cookie", "")
+            if valid:
+                stub.uses[sess_id] += 1
+            if not valid or (stub.expire_after and stub.uses[sess_id] > stub.expire_after):
+                self.send(200, "<html>Your session has expired.</html>")
+                return
+        number = form["sel_number"][0]
+        self.send(200, f"<table><tr><td>Open</td><td>1{number}</td>"
+                       f"<td>COMP {number} A</td></tr></table>")
+
+
+@pytest.fixture
+def stub_central(tmp_db):
+    servers = []
+
+    def start(**options):
+        server = StubCentral(**options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_every_request_takes_a_token(stub_central):
+    stub = stub_central(expire_after=2)
+    rate = 10
+    numbers = [str(1001 + i) for i in range(6)]
+    results = dict(fetcher.fetch_many(numbers, "202610", workers=3, rate=rate,
+                                      backoff=0.01, base_url=stub.url))
+
+    assert all(results[number] for number in numbers)
+    times = stub.times()
+    assert len(stub.times("p_select_term")) >= 3       # sessions were set up again
+    # session setup included, no two requests closer than the rate allows
+    assert times[-1] - times[0] >= (len(times) - 1) / rate - 0.05
+    assert min(b - a for a, b in zip(times, times[1:])) >= 0.5 / rate
+
+
+def test_blocked_server_gets_backoff(stub_central):
+    stub = stub_central(blocked=True)
+    backoff = 0.2
+    results = dict(fetcher.fetch_many(["1001"], "202610", workers=1, rate=100,
+                                      retries=2, backoff=backoff, base_url=stub.url))
+
+    assert results == {"1001": None}
+    searches = stub.times("p_course_search")
+    assert len(searches) == 3
+    for attempt, (a, b) in enumerate(zip(searches, searches[1:])):
+        assert b - a >= backoff * 2 ** attempt
@@ -0,0 +1,88 @@
+import random
+import re
+
+import pytest
+from bs4 import BeautifulSoup
+
+import html_extract
+from html_extract import etree, iter_rows
+from search_by_number import course_data_lines, join_course_lines, parse_course_data
+
+# Pieces of markup, valid or not, that random pages are glued together from
+TOKENS = ['<table>', '</table>', '<tr>', '</tr>', '<td>', '</td>', '<th>', '</th>', '<td/>',
+          '<tr/>', '<br>', '</br>', '<br/>', '<b>', '</b>', '<p>', '</p>',
+          '<script>x&amp;</script>', '<style>y</style>', '<!-- c -->', '<![CDATA[cd]]>',
+          '<?pi?>', '<!DOCTYPE html>', '<template>t</template>', '<rt>r</rt>', ' ', '\n',
+          '12345', 'COMP 2406 A', 'Ada Lovelace', '&amp;', '&nbsp;', '&#150;', '&#x41;',
+          '&#0;', '&#12ab;', '&#', ';', 'AT&T', '&notin;', '&bogus;', 'x\xa0',
+          'Meeting Date: Jan 07, 2026 to Apr 08, 2026', '<img src=x>', '</img>', '</td></tr>',
+          '<div>', '</div>', '<span>s</span>', '&lt', '\t', '<a href="x>', '<!-- open']
+
+
+# parse_course_data as it was before html_extract: the reference output
+def original_parse_course_data(html):
+    soup = BeautifulSoup(html, "html.parser")
+    lines = []
+    seen = set()
+    for table in soup.find_all("table"):
+        for row in table.find_all("tr"):
+            cells = row.find_all(["td", "th"])
+            if not cells:
+                continue
+            line = '\t'.join(cell.get_text(separator=' ', strip=True) for cell in cells)
+            if line in seen:
+                continue
+            if any([re.search(r'\b\d{5}\b', line), 'Meeting Date:' in line,
+                    'Also Register in:' in line, 'Section Information:' in line]):
+                seen.add(line)
+                lines.append(line)
+    return '\n'.join(lines) if lines else None
+
+
+def random_page(rng):
+    return "".join(rng.choice(TOKENS) for _ in range(rng.randint(1, 80)))
+
+
+def split(html, size):
+    return [html[i:i + size] for i in range(0, len(html), size)]
+
+
+@pytest.mark.parametrize("seed", range(0, 2000, 100))
+def test_default_matches_original_on_malformed_pages(seed):
+    for s in range(seed, seed + 100):
+        rng = random.Random(s)
+        html = random_page(rng)
+        expected = original_parse_course_data(html)
+        assert parse_course_data(html) == expected, html
+        for size in (1, rng.randint(2, 16)):
+            assert join_course_lines(course_data_lines(split(html, size))) == expected, html
+
+
+@pytest.mark.parametrize("backend", ["stream", "bs4"])
+def test_backends_match_original_on_malformed_pages(backend):
+    for s in range(500):
+        html = random_page(random.Random(s))
+        lines = join_course_lines(course_data_lines(html, backend))
+        assert lines == original_parse_course_data(html), html
+
+
+def test_default_backend_is_exact():
+    assert html_extract.DEFAULT_BACKEND == "stream"
+
+
+def well_formed_page(rng):
+    rows = []
+    for _ in range(rng.randint(1, 30)):
+        cells = "".join(f"<td>{rng.choice(TOKENS[27:33])} <b>{rng.randint(10000, 99999)}</b></td>"
+                        for _ in range(rng.randint(1, 5)))
+        rows.append(f"<tr>{cells}</tr>\n<tr><td>Meeting Date: Jan 07, 2026</td></tr>")
+    return f"<html><body><table>{''.join(rows)}</table></body></html>"
+
+
+@pytest.mark.skipif(etree is None, reason="lxml not installed")
+def test_lxml_matches_on_well_formed_pages():
+    for s in range(200):
+        rng = random.Random(s)
+        html = well_formed_page(rng)
+        assert list(iter_rows(split(html, rng.randint(1, 64)), "lxml")) == \
+            list(iter_rows(html, "bs4"))
@@ -0,0 +1,129 @@
+import itertools
+import random
+
+import pytest
+
+import optimal_schedule as opt
+from sections import make_section
+
+PROFS = ["Ada Lovelace", "Alan Turing", "Grace Hopper"]
+DAY_SETS = [0b00101, 0b01010, 0b10100, 0b00001, 0b00100, 0b10000]   # bitmasks over WEEK_DAYS
+TIMES = [(515, 595), (605, 685), (695, 775), (785, 865)]
+# off the 5-minute grid, back to back or a minute apart
+ODD_TIMES = [(600, 652), (652, 700), (653, 700), (601, 653), (699, 741), (741, 788)]
+
+
+# A course with few distinct times, so sections often share a footprint
+def random_course(rng, code, lectures, tutorials, times=TIMES):
+    sections = []
+    for lecture in "ABCDE"[:lectures]:
+        start, end = rng.choice(times)
+        sections.append(make_section(False, code, lecture, rng.choice(PROFS),
+                                     rng.choice(DAY_SETS[:3]), start, end, "HP"))
+        for t in range(1, tutorials + 1):
+            start, end = rng.choice(times)
+            sections.append(make_section(True, code, f"{lecture}{t}", "Teaching Assistant",
+                                         rng.choice(DAY_SETS[3:]), start, end, "SC"))
+    return sections
+
+
+def test_collapsed_options_only_offer_real_combinations():
+    rng = random.Random(0)
+    for _ in range(300):
+        sections = random_course(rng, "COMP 1000", rng.randint(1, 4), rng.randint(0, 4))
+        options = opt.options_for_course(sections)
+        real = {tuple(slot.section for slot in option) for option in options}
+        offered = set()
+        for option in opt.collapse_options(options):
+            choices = [slot.alternatives or (slot.section,) for slot in option]
+            combos = set(itertools.product(*choices))
+            assert combos <= real
+            offered |= combos
+        assert offered == real
+
+
+def test_collapse_keeps_lecture_tutorial_pairs_apart():
+    def section(name, has_number, days):
+        return make_section(has_number, "COMP 1000", name, "Ada Lovelace", days, 605, 685, "HP")
+    options = [[section("A", False, 0b101), section("A1", True, 0b10)],
+               [section("B", False, 0b101), section("B1", True, 0b10)],
+               [section("A", False, 0b101), section("A2", True, 0b10)]]
+    labels = [[opt.section_label(slot) for slot in option]
+              for option in opt.collapse_options(options)]
+    assert labels == [["A", "A1/A2"], ["B", "B1"]]
+
+
+# Course groups of a random term: some lectures online, some courses without tutorials
+def random_groups(rng, courses, times=TIMES):
+    sections = []
+    for i in range(courses):
+        code = f"COMP {1000 + i}"
+        sections += random_course(rng, code, rng.randint(1, 3), rng.randint(0, 3), times)
+        if rng.random() < 0.3:
+            sections.append(make_section(False, code, "W", rng.choice(PROFS), 0, None, None,
+                                         "ON"))
+    return opt.group_by_course(sections)
+
+
+# Reference: the original clash test, on start/end minutes rather than masks
+def interval_overlap(a, b):
+    if a.start is None or b.start is None:
+        return False
+    return bool(a.days & b.days) and not (a.end <= b.start or b.end <= a.start)
+
+
+# Reference: score every conflict-free combination and stable-sort them, the
+# way the search worked before branch-and-bound
+def brute_force_best(course_groups, top_n):
+    scored = []
+    for combo in itertools.product(*opt.build_course_options(course_groups)):
+        schedule = [slot for option in combo for slot in option]
+        if not any(interval_overlap(a, b) for a, b in itertools.combinations(schedule, 2)):
+            scored.append((opt.score_schedule(schedule), schedule))
+    scored.sort(key=lambda pair: pair[0])
+    return scored[:top_n]
+
+
+def test_times_overlap_matches_interval_rule():
+    def section(days, start, end):
+        return make_section(False, "COMP 1000", "A", "Ada Lovelace", days, start, end, "HP")
+    assert not opt.times_overlap(section(1, 600, 652), section(1, 653, 700))
+    assert not opt.times_overlap(section(1, 600, 652), section(1, 652, 700))
+    assert opt.times_overlap(section(1, 600, 653), section(1, 652, 700))
+
+    rng = random.Random(4)
+    for _ in range(2000):
+        a, b = (section(rng.randrange(1, 128), start, start + rng.randint(1, 120))
+                for start in (rng.randrange(0, 1440 - 120) for _ in range(2)))
+        assert opt.times_overlap(a, b) == interval_overlap(a, b)
+
+
+@pytest.mark.parametrize("times", [TIMES, ODD_TIMES])
+def test_best_schedules_match_brute_force(times):
+    rng = random.Random(1)
+    for _ in range(150):
+        groups = random_groups(rng, rng.randint(1, 5), times)
+        top_n = rng.randint(1, 6)
+        expected = brute_force_best(groups, top_n)
+        assert opt.best_schedules(groups, top_n, collapse=False) == expected
+        # collapsed, tied schedules become one with alternatives: only the best compares
+        assert ([score for score, _ in opt.best_schedules(groups, 1)]
+                == [score for score, _ in expected[:1]])
+
+
+def test_parallel_search_matches_serial():
+    rng = random.Random(2)
+    for _ in range(4):
+        groups = random_groups(rng, 6)
+        serial = opt.best_schedules(groups, 5, collapse=False)
+        assert opt.best_schedules(groups, 5, workers=2, collapse=False) == serial
+
+
+def test_course_order_does_not_break_ties():
+    rng = random.Random(3)
+    for _ in range(50):
+        groups = random_groups(rng, rng.randint(2, 5))
+        reordered = dict(reversed(list(groups.items())))
+        for collapse in (False, True):
+            assert (opt.best_schedules(reordered, 5, collapse=collapse)
+                    == opt.best_schedules(groups, 5, collapse=collapse))
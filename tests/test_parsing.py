@@ -0,0 +1,137 @@
+import random
+import re
+
+import pytest
+
+from parsing import parse_lines, split_by_course_number
+
+CODES = ["COMP 2406", "COMP 2804", "MATH 1104", "STAT 2507"]
+PROFS = ["Ada Lovelace", "Alan Turing", "Unknown Person Jr", "No No", "term course", ""]
+
+
+# The parser as it was before it streamed (minus its pprint), as the reference
+def original_parse_lines(wanted_courses, lines):
+    structured_results = []
+    seen_courses = set()
+
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip() if isinstance(lines[i], str) else lines[i]
+
+        if not line:
+            i += 1
+            continue
+
+        crn_match = re.search(r'\b(\d{5})\b', line)
+        course_match = re.search(r'([A-Z]{4})\s+(\d{4})\s+([A-Z]+\d*)', line)
+
+        if crn_match and course_match:
+            subject = course_match.group(1)
+            number = course_match.group(2)
+            section = course_match.group(3)
+            course_code = f"{subject} {number}"
+            course_key = f"{course_code} {section}"
+
+            if course_code not in wanted_courses:
+                i += 1
+                continue
+            if course_key in seen_courses:
+                i += 1
+                continue
+            seen_courses.add(course_key)
+
+            has_number = bool(re.search(r'\d', section)) or section.endswith('T')
+
+            parts = line.split('\t')
+            prof_name = "Unknown"
+            for part in reversed(parts):
+                part = part.strip()
+                if part and not re.search(r'(Meeting|Date|Yes|No|Lecture|Tutorial|Lab|\.5|^0$|\d{5})', part):
+                    words = part.split()
+                    if len(words) >= 2 and all(w[0].isupper() for w in words if w):
+                        prof_name = part
+                        break
+
+            days = "Unknown"
+            time_str = "Unknown"
+            building = "Unknown"
+
+            for j in range(i, min(i + 4, len(lines))):
+                next_line = lines[j].strip() if isinstance(lines[j], str) else lines[j]
+                if 'Meeting Date:' in next_line or 'Days:' in next_line:
+                    days_match = re.search(r'Days:\s*([A-Za-z ]*?)\s*Time:', next_line)
+                    time_match = re.search(r'Time:\s*([\d:\- ]+)', next_line)
+                    bldg_match = re.search(r'Building:\s*([^R]+?)\s*Room:', next_line)
+
+                    if days_match:
+                        days = days_match.group(1).strip() or "Unknown"
+                    if time_match:
+                        time_str = time_match.group(1).strip()
+                    if bldg_match:
+                        building = bldg_match.group(1).strip()
+                    break
+
+            structured_results.append([
+                has_number,
+                course_code,
+                section,
+                prof_name,
+                days,
+                time_str,
+                building
+            ])
+
+        i += 1
+
+    return structured_results
+
+
+def random_line(rng):
+    kind = rng.random()
+    if kind < 0.35:
+        section = rng.choice(["A", "B", "A1", "A2", "B1", "AT", "V"])
+        return (f"\tOpen\t{rng.randint(10000, 99999)}\t{rng.choice(CODES)} {section}"
+                f"\t0.5\tSome Title\t{rng.choice(['Lecture', 'Tutorial'])}\tNo\tNo"
+                f"\t{rng.choice(PROFS)}")
+    if kind < 0.7:
+        days = rng.choice(["Mon Wed", "Tue Thu", "Fri", ""])
+        time = rng.choice(["08:35 - 09:55", "13:05 - 14:25", ""])
+        building = rng.choice(["\tBuilding: HP\tRoom: 100", "\tBuilding: ON\tRoom: ", ""])
+        prefix = rng.choice(["Meeting Date: Jan 07, 2026 to Apr 08, 2026\t", ""])
+        return f"{prefix}Days: {days}\tTime: {time}{building}"
+    return rng.choice(["", "   ", "Also Register in: COMP 2406 A1", "Section Information: x",
+                       "Registration closed\t12345"])
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_parse_lines_matches_original(seed):
+    rng = random.Random(seed)
+    for _ in range(100):
+        lines = [random_line(rng) + rng.choice(["", "\n"]) for _ in range(rng.randint(0, 40))]
+        wanted = set(rng.sample(CODES, rng.randint(1, len(CODES))))
+        expected = original_parse_lines(wanted, lines)
+        # the original had no meeting dates, the eighth field
+        assert [record[:7] for record in parse_lines(wanted, lines)] == expected
+        assert [record[:7] for record in parse_lines(wanted, iter(lines))] == expected
+
+
+def test_parse_lines_keeps_meeting_dates():
+    lines = ["\tOpen\t12345\tCOMP 2406 A\t0.5\tSome Title\tLecture\tNo\tNo\tAda Lovelace",
+             "Meeting Date: Jan 07, 2026 to Apr 08, 2026\tDays: Mon Wed\tTime: 10:05 - 11:25"
+             "\tBuilding: HP\tRoom: 100",
+             "\tOpen\t12346\tCOMP 2406 A1\t0\tSome Title\tTutorial\tNo\tNo\tAlan Turing",
+             "Days: Fri\tTime: 13:05 - 14:25\tBuilding: SC\tRoom: 100"]
+    assert [record[7] for record in parse_lines({"COMP 2406"}, lines)] == [
+        "Jan 07, 2026 to Apr 08, 2026", "Unknown"]
+
+
+def test_split_by_course_number():
+    lines = ["Preamble",
+             "\tOpen\t12345\tCOMP 2406 A\t0.5\tLecture\tAda Lovelace",
+             "Meeting Date: Jan 07, 2026 to Apr 08, 2026\tDays: Mon\n",
+             "\tOpen\t12346\tMATH 1104 A\t0.5\tLecture\tAlan Turing",
+             "\tOpen\t12347\tCOMP 1104 B\t0.5\tLecture\tGrace Hopper"]
+    assert split_by_course_number(lines) == {
+        "2406": [lines[1], lines[2].rstrip("\n")],
+        "1104": [lines[3], lines[4]],
+    }
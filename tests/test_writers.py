@@ -0,0 +1,47 @@
+from datetime import date
+
+import database
+from sections import make_section
+from writers import schedule_html, schedule_ics, term_dates
+
+BLOB = "\n".join([
+    "\tOpen\t12345\tCOMP 2406 A\t0.5\tSome Title\tLecture\tNo\tNo\tAda Lovelace",
+    "Meeting Date: Jan 07, 2026 to Apr 08, 2026\tDays: Mon Wed\tTime: 10:05 - 11:25"
+    "\tBuilding: HP\tRoom: 100",
+])
+
+
+def events(ics):
+    return [block.split("END:VEVENT")[0] for block in ics.split("BEGIN:VEVENT")[1:]]
+
+
+def test_ics_events_follow_the_meeting_dates(tmp_db):
+    database.save_course("202610", "2406", BLOB)
+    (slot,) = database.get_sections("202610", ["COMP 2406"])
+    assert slot.dates == (date(2026, 1, 7), date(2026, 4, 8))
+
+    (event,) = events(schedule_ics([slot], *term_dates("202610")))
+    assert "DTSTART:20260107T100500" in event       # a Wednesday
+    assert "UNTIL=20260408T235959" in event
+
+
+def test_ics_events_without_dates_span_the_term():
+    slot = make_section(False, "COMP 2406", "A", "Ada Lovelace", 0b101, 605, 685, "HP")
+    (event,) = events(schedule_ics([slot], *term_dates("202610")))
+    assert "DTSTART:20260105T100500" in event       # the first Monday
+    assert "UNTIL=20260430T235959" in event
+
+
+def test_html_keeps_back_to_back_sections_off_the_grid():
+    schedule = [make_section(False, "COMP 2406", "A", "Ada Lovelace", 0b1, 600, 652, "HP"),
+                make_section(False, "COMP 2804", "A", "Alan Turing", 0b1, 653, 700, "HP")]
+    html = schedule_html(schedule)
+    assert "COMP 2406" in html and "COMP 2804" in html
+
+
+def test_ics_event_names_the_chosen_section():
+    slot = make_section(True, "COMP 2406", "A1", "Teaching Assistant", 0b10000, 605, 685, "SC")
+    slot = slot._replace(alternatives=("A1", "A2", "A4"))
+    (event,) = events(schedule_ics([slot], *term_dates("202610")))
+    assert "SUMMARY:COMP 2406 A1\r\n" in event
+    assert "DESCRIPTION:Teaching Assistant\\nAlternatives: A2\\, A4\r\n" in event